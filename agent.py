@@ -14,6 +14,7 @@ try:
 except ModuleNotFoundError:
     def load_dotenv(*_args, **_kwargs) -> None:
         print("[WARN] python-dotenv is not installed; skipping .env loading.")
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 
@@ -22,15 +23,41 @@ SRC_DIR = ROOT_DIR / "src"
 if SRC_DIR.exists():
     sys.path.insert(0, str(SRC_DIR))
 
-from cr_agent.config import load_openai_config
+from cr_agent.config import (
+    RateLimitConfig,
+    load_breaker_config,
+    load_budget_config,
+    load_cache_config,
+    load_endpoint_configs,
+    load_hedge_config,
+    load_openai_config,
+    load_rate_limit_config,
+)
+from cr_agent.budget import LLMUsageStats, RunBudget, format_budget_summary
+from cr_agent.cache import SQLiteCache
+from cr_agent.llm_cache import CachedLLM
+from cr_agent.circuit_breaker import CircuitBreaker
+from cr_agent.single_flight import SingleFlight
 from cr_agent.context_refiner import ContextRefiner
-from cr_agent.file_review import AsyncRateLimiter, FileReviewEngine
+from cr_agent.file_review import FileReviewEngine
+from cr_agent.hedging import HedgePolicy
+from cr_agent.incremental import IncrementalReviewer
+from cr_agent.llm_pool import LLMPool, PoolEndpoint
+from cr_agent.pretagger import PreTagger
 from cr_agent.metrics import build_metrics_payload, send_metrics_report
 from cr_agent.models import AgentState, CommitDiff
-from cr_agent.rate_limiter import RateLimitedLLM
+from cr_agent.rate_limiter import (
+    DEFAULT_LLM_PRIORITIES,
+    AdaptiveRateLimiter,
+    AsyncRateLimiter,
+    RateLimitedLLM,
+    TokenRateLimiter,
+)
+from cr_agent.shared_rate_limiter import SharedRateLimiter
 from cr_agent.reporting import render_markdown_report, render_ndjson_report, summarize_to_cli, write_markdown_report
+from cr_agent.rules import get_rule_doc_store
 from cr_agent.profile import ProfileConfig, RepoProfile, load_profile
-from tools.git_tools import get_last_commit_diff
+from tools.git_tools import get_blob_cache, get_last_commit_diff, resolve_commit_sha
 
 
 def _load_env(env_file: Optional[str]) -> None:
@@ -91,17 +118,111 @@ def _safe_filename_fragment(text: str, *, max_len: int = 50) -> str:
     return value
 
 
-def _build_review_agent(file_reviewer: FileReviewEngine, context_refiner: Optional[ContextRefiner]):
+def _build_rate_limiter(config: RateLimitConfig) -> Optional[AsyncRateLimiter]:
+    if config.adaptive:
+        return AdaptiveRateLimiter(
+            config.start_qps,
+            burst=config.max_burst,
+            max_inflight=config.max_inflight,
+            min_qps=config.min_qps,
+            max_qps=config.max_qps,
+        )
+    if config.enabled and config.shared_state:
+        return SharedRateLimiter(
+            config.max_qps,
+            state_path=config.shared_state,
+            burst=config.max_burst,
+            max_inflight=config.max_inflight,
+        )
+    if config.enabled:
+        return AsyncRateLimiter(config.max_qps, burst=config.max_burst, max_inflight=config.max_inflight)
+    return None
+
+
+def _wrap_llm(llm_base: BaseChatModel, config: RateLimitConfig) -> BaseChatModel:
+    rate_limiter = _build_rate_limiter(config)
+    token_limiter = TokenRateLimiter(config.max_tpm) if config.max_tpm else None
+    if not rate_limiter and not token_limiter:
+        return llm_base
+    return RateLimitedLLM(
+        llm_base,
+        rate_limiter,
+        token_limiter=token_limiter,
+        max_throttle_retries=config.throttle_retries,
+    )
+
+
+LLM_TIMEOUT_SECONDS = 600
+
+
+def _build_llm(rate_limit_config: RateLimitConfig) -> BaseChatModel:
+    """Single endpoint from BASE_URL/API_KEY, or a pool when CR_LLM_ENDPOINTS points to an endpoint list."""
+    endpoints_path = (os.getenv("CR_LLM_ENDPOINTS") or "").strip()
+    if endpoints_path:
+        endpoints = []
+        endpoint_configs = load_endpoint_configs(
+            Path(endpoints_path), rate_limit=rate_limit_config, timeout=LLM_TIMEOUT_SECONDS
+        )
+        for endpoint in endpoint_configs:
+            llm_base = ChatOpenAI(
+                base_url=endpoint.base_url,
+                api_key=endpoint.api_key,
+                model=endpoint.model_name,
+                temperature=endpoint.temperature,
+                timeout=endpoint.timeout,
+            )
+            endpoints.append(
+                PoolEndpoint(name=endpoint.name, llm=_wrap_llm(llm_base, endpoint.rate_limit), weight=endpoint.weight)
+            )
+        return LLMPool(endpoints)
+
+    model_config = load_openai_config(timeout=LLM_TIMEOUT_SECONDS)
+    llm_base = ChatOpenAI(
+        base_url=model_config.base_url,
+        api_key=model_config.api_key,
+        model=model_config.model_name,
+        temperature=model_config.temperature,
+        timeout=model_config.timeout,
+    )
+    return _wrap_llm(llm_base, rate_limit_config)
+
+
+def _build_review_agent(
+    file_reviewer: FileReviewEngine,
+    context_refiner: Optional[ContextRefiner],
+    budget: Optional[RunBudget] = None,
+    incremental: Optional[IncrementalReviewer] = None,
+):
     async def review_all_files(state: AgentState):
         commit_diff = state["commit_diff"]
-        tasks = [file_reviewer.review_file(fd) for fd in commit_diff.files]
-        return {"file_cr_result": await asyncio.gather(*tasks)} if tasks else {"file_cr_result": []}
+        # 批量打标的输入与之后实际审查的 diff 一致：增量审查只打标新增 hunk，可整体复用的文件不参与
+        if incremental:
+            to_review = (
+                incremental.diff_to_review(fd, context_lines=commit_diff.context_lines) for fd in commit_diff.files
+            )
+            await file_reviewer.prefetch_tags(fd for fd in to_review if fd is not None)
+        else:
+            await file_reviewer.prefetch_tags(commit_diff.files)
+        try:
+            if incremental:
+                tasks = [
+                    incremental.review_file(fd, commit_sha=commit_diff.commit_sha, context_lines=commit_diff.context_lines)
+                    for fd in commit_diff.files
+                ]
+            else:
+                tasks = [file_reviewer.review_file(fd, context_lines=commit_diff.context_lines) for fd in commit_diff.files]
+            return {"file_cr_result": await asyncio.gather(*tasks)} if tasks else {"file_cr_result": []}
+        finally:
+            file_reviewer.discard_prefetched_tags()
 
     async def refine_contexts(state: AgentState):
         if not context_refiner:
             return {}
         commit_diff = state["commit_diff"]
         file_results = state.get("file_cr_result", [])
+        if budget and budget.level() != "ok":
+            budget.note_skip("refine", commit_diff.commit_sha or "latest")
+            return {}
         await context_refiner.refine(commit_diff=commit_diff, file_results=file_results)
         return {"file_cr_result": file_results}
 
@@ -111,6 +232,7 @@ def _build_review_agent(file_reviewer: FileReviewEngine, context_refiner: Option
                 repo_path=state["repo_path"],
                 commit_diff=state["commit_diff"],
                 file_results=state.get("file_cr_result", []),
+                budget_summary=budget.summary() if budget else None,
             )
         }
 
@@ -133,6 +255,10 @@ def main():
     parser.add_argument("--repo", help="Repository root path (arg > env > .env).")
     parser.add_argument("--profile", help="Profile YAML for repo/domain/skip rules (arg > env > none).")
     parser.add_argument("--env-file", dest="env_file", help="Custom .env file to load (no override).")
+    parser.add_argument(
+        "--since",
+        help="Previously reviewed commit; reuse its results for unchanged hunks (arg > env CR_REVIEW_SINCE).",
+    )
     args = parser.parse_args()
 
     _load_env(args.env_file)
@@ -148,33 +274,95 @@ def main():
     allowed_tags = selected_repo.domains if selected_repo else None
     blacklist_patterns = selected_repo.skip_regex if selected_repo else None
     blacklist_basenames = selected_repo.skip_basenames if selected_repo else None
+    priorities = dict(DEFAULT_LLM_PRIORITIES)
+    if selected_repo:
+        priorities.update(selected_repo.priorities)
+
+    llm = _build_llm(load_rate_limit_config())
+    budget_config = load_budget_config()
+    budget: Optional[RunBudget] = None
+    if budget_config.enabled:
+        budget = RunBudget(
+            max_calls=budget_config.max_calls,
+            max_tokens=budget_config.max_tokens,
+            max_cost=budget_config.max_cost,
+            cost_per_1k_input=budget_config.cost_per_1k_input,
+            cost_per_1k_output=budget_config.cost_per_1k_output,
+        )
+    breaker_config = load_breaker_config()
+    breaker = (
+        CircuitBreaker(failure_threshold=breaker_config.failure_threshold, cooldown=breaker_config.cooldown)
+        if breaker_config.enabled
+        else None
+    )
+    single_flight_enabled = os.getenv("CR_SINGLE_FLIGHT", "1").strip().lower() not in {"0", "false", "no"}
+    single_flight = SingleFlight() if single_flight_enabled else None
+    usage = LLMUsageStats()
+    # 预算、熔断、请求合并与用量统计包在最外层（池之外）：每次逻辑调用只计一次，且只有整个池都失败才计为故障
+    # 外层不做限速，也不把 429 转成 LLMThrottledError：限流的重试与降级只由配置了限速的内层负责
+    llm = RateLimitedLLM(
+        llm, budget=budget, breaker=breaker, single_flight=single_flight, usage=usage, handle_throttling=False
+    )
+    hedge_config = load_hedge_config()
+    hedge_policy = (
+        HedgePolicy(percentile=hedge_config.percentile, max_hedge_ratio=hedge_config.max_ratio)
+        if hedge_config.enabled
+        else None
+    )
 
-    max_qps_value = os.getenv("CR_MAX_QPS")
-    rate_limiter = None
-    if max_qps_value:
-        try:
-            max_qps = float(max_qps_value)
-            if max_qps > 0:
-                rate_limiter = AsyncRateLimiter(max_qps)
-        except ValueError as exc:
-            raise ValueError(f"CR_MAX_QPS must be a number, got {max_qps_value}") from exc
-
-    model_config = load_openai_config(timeout=600)
-    llm_base = ChatOpenAI(
-        base_url=model_config.base_url,
-        api_key=model_config.api_key,
-        model=model_config.model_name,
-        temperature=model_config.temperature,
-        timeout=model_config.timeout,
+    cache_config = load_cache_config()
+    review_cache = tagging_cache = None
+    if cache_config.enabled:
+        review_cache = SQLiteCache(
+            cache_config.directory / "review.sqlite", max_bytes=int(cache_config.review_max_mb * 1024 * 1024)
+        )
+        tagging_cache = SQLiteCache(
+            cache_config.directory / "tagging.sqlite",
+            max_bytes=int(cache_config.tagging_max_mb * 1024 * 1024),
+            ttl=cache_config.tagging_ttl,
+        )
+    llm_cache = (
+        SQLiteCache(
+            cache_config.directory / "llm_responses.sqlite",
+            max_bytes=int(cache_config.llm_max_mb * 1024 * 1024),
+            ttl=cache_config.llm_ttl,
+        )
+        if cache_config.enabled and cache_config.llm_mode != "off"
+        else None
     )
-    llm = RateLimitedLLM(llm_base, rate_limiter) if rate_limiter else llm_base
+    cached_llm = CachedLLM(llm, llm_cache, mode=cache_config.llm_mode) if llm_cache else llm
 
+    fused_max_lines_raw = os.getenv("CR_FUSED_REVIEW_MAX_LINES", "30").strip() or "30"
+    try:
+        fused_max_lines = max(0, int(fused_max_lines_raw))
+    except ValueError:
+        raise ValueError(f"CR_FUSED_REVIEW_MAX_LINES must be an integer, got {fused_max_lines_raw}")
+    tag_batch_raw = os.getenv("CR_TAG_BATCH_MAX_TOKENS", "4000").strip() or "4000"
+    try:
+        tag_batch_max_tokens = max(0, int(tag_batch_raw))
+    except ValueError:
+        raise ValueError(f"CR_TAG_BATCH_MAX_TOKENS must be an integer, got {tag_batch_raw}")
+    max_chunks_raw = os.getenv("CR_REVIEW_MAX_CHUNKS", "8").strip() or "8"
+    try:
+        max_review_chunks = max(1, int(max_chunks_raw))
+    except ValueError:
+        raise ValueError(f"CR_REVIEW_MAX_CHUNKS must be an integer, got {max_chunks_raw}")
     file_reviewer = FileReviewEngine(
         llm,
-        rate_limiter=rate_limiter,
         allowed_tags=allowed_tags,
         blacklist_patterns=blacklist_patterns,
         blacklist_basenames=blacklist_basenames,
+        hedge_policy=hedge_policy,
+        priorities=priorities,
+        budget=budget,
+        review_cache=review_cache,
+        tagging_cache=tagging_cache,
+        cached_llm=cached_llm,
+        fused_max_lines=fused_max_lines,
+        tag_batch_max_tokens=tag_batch_max_tokens,
+        pretagger=selected_repo.pretagger if selected_repo else PreTagger(),
+        max_review_chunks=max_review_chunks,
+        rule_detectors=os.getenv("CR_RULE_DETECTORS", "1").strip().lower() not in {"0", "false", "no"},
     )
     refine_enabled = os.getenv("CR_CONTEXT_REFINE", "1").strip().lower() not in {"0", "false", "no"}
     refine_min_lines_raw = os.getenv("CR_CONTEXT_REFINE_MIN_LINES", "30").strip()
@@ -184,8 +372,16 @@ def main():
         raise ValueError(
             f"CR_CONTEXT_REFINE_MIN_LINES must be an integer, got {refine_min_lines_raw}"
         )
-    context_refiner = ContextRefiner(llm, min_hunk_lines=refine_min_lines) if refine_enabled else None
-    review_agent = _build_review_agent(file_reviewer, context_refiner)
+    context_refiner = (
+        ContextRefiner(cached_llm, min_hunk_lines=refine_min_lines, priority=priorities["refine"]) if refine_enabled else None
+    )
+    since_rev = (args.since or os.getenv("CR_REVIEW_SINCE") or "").strip()
+    since_sha = resolve_commit_sha(repo_path, since_rev) if since_rev else None
+    if since_sha and review_cache is None:
+        print("[WARN] 增量审查需要配置 CR_CACHE_DIR，本次执行全量审查", file=sys.stderr)
+    # 配置了缓存目录时总是记录 hunk 指纹，之后的运行可以用本次提交作为增量基线
+    incremental = IncrementalReviewer(file_reviewer, review_cache, since_sha=since_sha) if review_cache else None
+    review_agent = _build_review_agent(file_reviewer, context_refiner, budget, incremental)
 
     result = asyncio.run(review_agent.ainvoke({"repo_path": repo_path, "file_cr_result": []}))
 
@@ -195,6 +391,7 @@ def main():
         repo_path=repo_path,
         commit_diff=commit_diff,
         file_results=file_results,
+        budget_summary=budget.summary() if budget else None,
     )
     eval_mode = os.getenv("CR_EVAL_MODE")
     ndjson_text = None
@@ -229,6 +426,74 @@ def main():
     summarize_to_cli(commit_diff=commit_diff, file_results=file_results, report_path=report_path)
     if ndjson_path:
         print(f"[CR] NDJSON: {ndjson_path}")
+    if hedge_policy:
+        hedge_stats = hedge_policy.stats()
+        print(
+            f"[CR] Hedge: 调用 {hedge_stats['calls']} | 对冲 {hedge_stats['hedges']} | 对冲胜出 {hedge_stats['hedge_wins']}"
+        )
+    for cache_label, cache in (
+        ("Tagging cache", tagging_cache),
+        ("Review cache", review_cache),
+        ("LLM cache", llm_cache),
+    ):
+        if cache:
+            cache_stats = cache.stats()
+            print(
+                f"[CR] {cache_label}: 命中 {cache_stats['hits']} | 未命中 {cache_stats['misses']} | "
+                f"写入 {cache_stats['writes']} | 读 {cache_stats['bytes_read']} B | 写 {cache_stats['bytes_written']} B"
+            )
+    if incremental and since_sha:
+        inc_stats = incremental.stats()
+        print(
+            f"[CR] Incremental: 基线 {since_sha[:12]} | 整文件复用 {inc_stats['files_reused']} | "
+            f"部分复用 {inc_stats['files_partial']} | 复用 hunk {inc_stats['hunks_reused']} | 重新审查 hunk {inc_stats['hunks_reviewed']}"
+        )
+    if incremental and incremental.files_patch_reused:
+        print(f"[CR] Patch reuse: 按补丁指纹复用 {incremental.files_patch_reused} 个文件的审查结果")
+    pretag_stats = file_reviewer.pretagger_stats
+    if pretag_stats.decided:
+        print(
+            f"[CR] Pre-tagger: 本地判定 {pretag_stats.decided}/{pretag_stats.decided + pretag_stats.fallback} 个文件，"
+            f"省去 {pretag_stats.saved_calls} 次打标调用"
+            + (f"（另有 {pretag_stats.cached} 个文件本可命中打标缓存）" if pretag_stats.cached else "")
+        )
+    detector_stats = file_reviewer.detectors.stats
+    if detector_stats.hits or detector_stats.local_tags:
+        print(
+            f"[CR] Rule detectors: 本地检出 {detector_stats.hits} 个问题 | "
+            f"仅本地检查的标签审查 {detector_stats.local_tags} 次（未调用 LLM）"
+        )
+    if file_reviewer.batch_tag_calls:
+        print(
+            f"[CR] Batch tagging: 批量调用 {file_reviewer.batch_tag_calls} | 覆盖文件 {file_reviewer.batch_tagged_files}"
+        )
+    if file_reviewer.chunked_calls:
+        print(f"[CR] Chunked review: 大文件分段审查调用 {file_reviewer.chunked_calls} 次")
+    if file_reviewer.fused_calls:
+        print(
+            f"[CR] Fused review: 合并调用 {file_reviewer.fused_calls} | 覆盖标签 {file_reviewer.fused_tags} | "
+            f"回退逐标签 {file_reviewer.fused_fallbacks}"
+        )
+    blob_stats = get_blob_cache().stats()
+    if blob_stats["hits"] or blob_stats["misses"]:
+        print(f"[CR] Blob cache: 命中 {blob_stats['hits']} | 未命中 {blob_stats['misses']} | 缓存 {blob_stats['bytes']} B")
+    doc_stats = get_rule_doc_store().stats()
+    if doc_stats["hits"]:
+        print(f"[CR] Rule docs: 命中 {doc_stats['hits']} | 磁盘加载 {doc_stats['loads']} | 文档数 {doc_stats['documents']}")
+    if budget:
+        print(f"[CR] Budget: {format_budget_summary(budget.summary())}")
+    if usage.cached_input_tokens:
+        print(
+            f"[CR] Prompt cache: 输入 tokens {usage.input_tokens} | 缓存命中 {usage.cached_input_tokens} "
+            f"({usage.cache_hit_ratio:.0%}) | 命中调用 {usage.calls_with_cache_hit}/{usage.calls}"
+        )
+    if single_flight and single_flight.shared:
+        print(f"[CR] Single-flight: 调用 {single_flight.calls} | 合并 {single_flight.shared}")
+    if breaker and breaker.opened_count:
+        breaker_stats = breaker.stats()
+        print(
+            f"[CR] Breaker: 熔断 {breaker_stats['opened']} 次 | 快速失败 {breaker_stats['rejected']} 次 | 当前 {breaker_stats['state']}"
+        )
 
     metrics_base_url = os.getenv("CR_METRICS_BASE_URL", "http://localhost:8869").strip()
     if metrics_base_url and metrics_base_url.lower() not in {"0", "false", "no"}:
@@ -236,6 +501,8 @@ def main():
             repo_path=repo_path,
             commit_diff=commit_diff,
             file_results=file_results,
+            llm_budget=budget.summary() if budget else None,
+            llm_usage=usage.summary(),
         )
         send_metrics_report(payload, base_url=metrics_base_url)
     return result
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional
+
+from langchain_core.outputs import ChatResult
+
+BudgetLevel = Literal["ok", "skip_refine", "essential_tags", "exhausted"]
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised before an LLM call once the per-run budget is used up."""
+
+
+@dataclass(frozen=True)
+class BudgetReservation:
+    """Budget held by one in-flight call: the call itself plus its estimated prompt tokens."""
+
+    estimated_input: int
+
+
+@dataclass
+class RunBudget:
+    """单次 agent.py 运行的 LLM 预算（调用数 / token 数 / 估算费用，任一维度耗尽即视为耗尽）。
+
+    用量越高降级越多：达到 ``skip_refine_at`` 跳过上下文精炼，达到 ``essential_tags_at``
+    只保留高优先级标签，耗尽后拒绝新的 LLM 调用，剩余文件标记为需人工审查。
+
+    调用发出前先 ``reserve``：把这次调用与预估的 prompt token 计入在途预约，预约后会超出上限的调用
+    直接拒绝，因此并发发出的调用也不会冲破上限；调用结束后 ``settle`` 按实际用量结算，失败则 ``release``。
+    """
+
+    max_calls: Optional[int] = None
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
+    skip_refine_at: float = 0.6
+    essential_tags_at: float = 0.8
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    reserved_calls: int = 0
+    reserved_tokens: int = 0
+    skipped: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in (self.max_calls, self.max_tokens, self.max_cost))
+
+    @property
+    def cost(self) -> float:
+        return (self.input_tokens * self.cost_per_1k_input + self.output_tokens * self.cost_per_1k_output) / 1000.0
+
+    def used_fraction(self, *, extra_calls: int = 0, extra_tokens: int = 0) -> float:
+        """Fraction of the tightest limit used, counting in-flight reservations (plus ``extra_*``)."""
+        calls = self.calls + self.reserved_calls + extra_calls
+        input_tokens = self.input_tokens + self.reserved_tokens + extra_tokens
+        fractions = [0.0]
+        if self.max_calls:
+            fractions.append(calls / self.max_calls)
+        if self.max_tokens:
+            fractions.append((input_tokens + self.output_tokens) / self.max_tokens)
+        if self.max_cost:
+            cost = (input_tokens * self.cost_per_1k_input + self.output_tokens * self.cost_per_1k_output) / 1000.0
+            fractions.append(cost / self.max_cost)
+        return max(fractions)
+
+    def level(self) -> BudgetLevel:
+        used = self.used_fraction()
+        if used >= 1.0:
+            return "exhausted"
+        if used >= self.essential_tags_at:
+            return "essential_tags"
+        if used >= self.skip_refine_at:
+            return "skip_refine"
+        return "ok"
+
+    def check(self) -> None:
+        if self.level() == "exhausted":
+            raise BudgetExceededError("本次运行的 LLM 预算已耗尽")
+
+    def reserve(self, estimated_input: int = 0) -> BudgetReservation:
+        """Admit one call or raise BudgetExceededError; check and reservation happen in one step."""
+        estimated_input = max(0, int(estimated_input))
+        if self.used_fraction() >= 1.0 or self.used_fraction(extra_calls=1, extra_tokens=estimated_input) > 1.0:
+            raise BudgetExceededError("本次运行的 LLM 预算已耗尽")
+        self.reserved_calls += 1
+        self.reserved_tokens += estimated_input
+        return BudgetReservation(estimated_input)
+
+    def release(self, reservation: BudgetReservation) -> None:
+        """Drop the reservation of a call that failed without usage."""
+        self.reserved_calls -= 1
+        self.reserved_tokens -= reservation.estimated_input
+
+    def settle(self, reservation: BudgetReservation, result: ChatResult) -> None:
+        """Replace the reservation with the usage reported by the provider (the estimate when absent)."""
+        self.release(reservation)
+        self.record(result, estimated_input=reservation.estimated_input)
+
+    def record(self, result: ChatResult, *, estimated_input: int = 0) -> None:
+        self.calls += 1
+        input_tokens, output_tokens = _usage_tokens(result)
+        self.input_tokens += input_tokens if input_tokens is not None else estimated_input
+        self.output_tokens += output_tokens or 0
+
+    def note_skip(self, kind: str, item: str) -> None:
+        self.skipped.setdefault(kind, []).append(item)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "calls": self.calls,
+            "max_calls": self.max_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "max_tokens": self.max_tokens,
+            "estimated_cost": round(self.cost, 6),
+            "max_cost": self.max_cost,
+            "used_fraction": round(self.used_fraction(), 4),
+            "level": self.level(),
+            "skipped": {kind: list(items) for kind, items in self.skipped.items()},
+        }
+
+
+@dataclass
+class LLMUsageStats:
+    """实际发出的 LLM 调用的 token 用量，含模型服务端 prompt 缓存命中的输入 token。"""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+    calls_with_cache_hit: int = 0
+
+    def record(self, result: ChatResult) -> None:
+        self.calls += 1
+        input_tokens, output_tokens = _usage_tokens(result)
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+        cached = _cached_input_tokens(result)
+        if cached:
+            self.cached_input_tokens += cached
+            self.calls_with_cache_hit += 1
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "calls_with_cache_hit": self.calls_with_cache_hit,
+            "cache_hit_ratio": round(self.cache_hit_ratio, 4),
+        }
+
+
+def _cached_input_tokens(result: ChatResult) -> int:
+    """Prompt tokens served from the provider's prompt cache (0 when not reported)."""
+    for generation in result.generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            details = usage.get("input_token_details") or {}
+            return int(details.get("cache_read") or 0)
+    token_usage = (result.llm_output or {}).get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or 0)
+
+
+def _usage_tokens(result: ChatResult) -> tuple[Optional[int], Optional[int]]:
+    for generation in result.generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+    token_usage = (result.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return int(token_usage.get("prompt_tokens") or 0), int(token_usage.get("completion_tokens") or 0)
+    return None, None
+
+
+def format_budget_summary(summary: Dict[str, object]) -> str:
+    """One-line Chinese summary used by the CLI and the Markdown report."""
+    parts = [f"调用 {summary['calls']}" + (f"/{summary['max_calls']}" if summary.get("max_calls") else "")]
+    tokens = int(summary["input_tokens"]) + int(summary["output_tokens"])  # type: ignore[arg-type]
+    parts.append(f"tokens {tokens}" + (f"/{summary['max_tokens']}" if summary.get("max_tokens") else ""))
+    if summary.get("max_cost"):
+        parts.append(f"费用 {summary['estimated_cost']}/{summary['max_cost']}")
+    skipped = summary.get("skipped") or {}
+    if skipped:
+        labels = {"refine": "上下文精炼", "tags": "低优先级标签", "files": "文件"}
+        detail = "，".join(f"{labels.get(kind, kind)} {len(items)}" for kind, items in skipped.items())  # type: ignore[union-attr]
+        parts.append(f"因预算跳过：{detail}")
+    return " | ".join(parts)
+
+
+__all__ = ["BudgetExceededError", "BudgetLevel", "BudgetReservation", "LLMUsageStats", "RunBudget", "format_budget_summary"]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import time
+from typing import Literal, Optional
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+# 视为端点故障的 HTTP 状态码；其余 4xx（参数错误、上下文超长等）是请求本身的问题，不计入熔断
+ENDPOINT_FAILURE_STATUS_CODES: tuple[int, ...] = (408, 429)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+    def __init__(self, message: str, *, retry_in: float = 0.0):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+# 第三方 SDK 的连接/超时异常按类名识别，避免引入可选依赖：openai 的 APIConnectionError（含 APITimeoutError）、
+# httpx 的 TransportError（含 TimeoutException、NetworkError）
+TRANSPORT_ERROR_NAMES: frozenset[str] = frozenset({"APIConnectionError", "APITimeoutError", "TransportError"})
+
+
+def is_transport_error(exc: BaseException) -> bool:
+    """Connection failures and timeouts, as opposed to errors raised by the request or the caller's own code."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSPORT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """Connection errors, timeouts, exhausted throttling retries and 5xx count towards opening the breaker."""
+    if is_transport_error(exc):
+        return True
+    # LLMThrottledError 定义在 rate_limiter（它依赖本模块），按类名识别
+    if any(cls.__name__ == "LLMThrottledError" for cls in type(exc).__mro__):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if not isinstance(status, int):
+        return False  # 解析/校验失败等请求本身的问题不代表端点故障
+    return status in ENDPOINT_FAILURE_STATUS_CODES or status >= 500
+
+
+class CircuitBreaker:
+    """LLM 端点熔断器：连续 ``failure_threshold`` 次端点故障后打开，打开期间调用直接失败。
+
+    打开 ``cooldown`` 秒后进入半开状态，只放行 ``half_open_trials`` 个试探调用：
+    试探成功则关闭熔断，失败则重新打开并再等待一个 cooldown。
+    """
+
+    def __init__(self, *, failure_threshold: int = 5, cooldown: float = 30.0, half_open_trials: int = 1):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = max(0.0, float(cooldown))
+        self.half_open_trials = max(1, int(half_open_trials))
+        self._state: BreakerState = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trials_inflight = 0
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = "half_open"
+            self._trials_inflight = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError; call record_success/record_failure afterwards."""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and self._trials_inflight < self.half_open_trials:
+            self._trials_inflight += 1
+            return
+        self.rejected += 1
+        retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at)) if state == "open" else 0.0
+        raise CircuitOpenError("LLM 端点熔断中，跳过本次调用", retry_in=retry_in)
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        if self._state == "half_open":
+            self._state = "closed"
+            self._trials_inflight = 0
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        if exc is not None and not is_endpoint_failure(exc):
+            self.record_ignored()
+            return
+        self._consecutive_failures += 1
+        if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def record_ignored(self) -> None:
+        """The call ended without telling us anything about endpoint health (e.g. a 400)."""
+        if self._state == "half_open" and self._trials_inflight > 0:
+            self._trials_inflight -= 1
+
+    def _open(self) -> None:
+        if self._state != "open":
+            self.opened_count += 1
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._trials_inflight = 0
+
+    def stats(self) -> dict[str, object]:
+        return {"state": self.state, "opened": self.opened_count, "rejected": self.rejected}
+
+
+__all__ = [
+    "BreakerState",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ENDPOINT_FAILURE_STATUS_CODES",
+    "is_endpoint_failure",
+    "is_transport_error",
+]
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from dotenv import load_dotenv
 
 _ = load_dotenv()
 
 DEFAULT_MODEL_NAME = "gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_TIMEOUT = 60
+DEFAULT_ADAPTIVE_START_QPS = 5.0
+LLM_CACHE_MODES: tuple[str, ...] = ("off", "on", "read-only", "refresh")
 
 
 @dataclass(frozen=True)
@@ -17,8 +21,8 @@ class OpenAIConfig:
     base_url: str
     api_key: str
     model_name: str = DEFAULT_MODEL_NAME
-    temperature: float = 0.7
-    timeout: int = 60
+    temperature: float = DEFAULT_TEMPERATURE
+    timeout: int = DEFAULT_TIMEOUT
 
 
 def _require_env(name: str) -> str:
@@ -31,8 +35,8 @@ def _require_env(name: str) -> str:
 def load_openai_config(
     *,
     model_name: Optional[str] = None,
-    temperature: float = 0.7,
-    timeout: int = 60,
+    temperature: float = DEFAULT_TEMPERATURE,
+    timeout: int = DEFAULT_TIMEOUT,
 ) -> OpenAIConfig:
     """Load model/runtime configuration from environment variables."""
     base_url = _require_env("BASE_URL")
@@ -55,3 +59,260 @@ def load_repo_path(*, default: Optional[str] = None) -> Path:
     if default is not None:
         return Path(default).expanduser().resolve()
     raise ValueError("CR_REPO_PATH 未配置，请在 .env 中设置仓库路径")
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    max_qps: Optional[float] = None
+    max_burst: int = 1
+    max_inflight: Optional[int] = None
+    max_tpm: Optional[int] = None
+    adaptive: bool = False
+    min_qps: float = 0.2
+    throttle_retries: int = 3
+    shared_state: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.adaptive or self.max_qps is not None or self.max_inflight is not None
+
+    @property
+    def start_qps(self) -> Optional[float]:
+        if self.adaptive and self.max_qps is None:
+            return DEFAULT_ADAPTIVE_START_QPS
+        return self.max_qps
+
+
+def _optional_env_number(name: str, cast):
+    value = (os.getenv(name) or "").strip()
+    if not value:
+        return None
+    try:
+        number = cast(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number, got {value}") from exc
+    return number if number > 0 else None
+
+
+def load_rate_limit_config() -> RateLimitConfig:
+    """Read CR_MAX_QPS / CR_MAX_BURST / CR_MAX_INFLIGHT / CR_MAX_TPM and the adaptive (AIMD) switches.
+
+    Unset or non-positive numbers disable that limit. With CR_ADAPTIVE_RATE on,
+    CR_MAX_QPS becomes the ceiling (unbounded when unset) and CR_MIN_QPS the floor.
+    CR_SHARED_RATE_LIMIT_FILE makes the QPS/inflight limits host-wide across agent.py processes.
+    """
+    max_qps = _optional_env_number("CR_MAX_QPS", float)
+    max_burst = _optional_env_number("CR_MAX_BURST", int) or 1
+    max_inflight = _optional_env_number("CR_MAX_INFLIGHT", int)
+    max_tpm = _optional_env_number("CR_MAX_TPM", int)
+    adaptive = os.getenv("CR_ADAPTIVE_RATE", "0").strip().lower() in {"1", "true", "yes"}
+    min_qps = _optional_env_number("CR_MIN_QPS", float) or 0.2
+    retries_raw = (os.getenv("CR_THROTTLE_RETRIES") or "").strip()
+    try:
+        throttle_retries = max(0, int(retries_raw)) if retries_raw else 3
+    except ValueError as exc:
+        raise ValueError(f"CR_THROTTLE_RETRIES must be an integer, got {retries_raw}") from exc
+    shared_state = (os.getenv("CR_SHARED_RATE_LIMIT_FILE") or "").strip() or None
+    if shared_state and adaptive:
+        raise ValueError("CR_SHARED_RATE_LIMIT_FILE cannot be combined with CR_ADAPTIVE_RATE")
+    return RateLimitConfig(
+        max_qps=max_qps,
+        max_burst=max_burst,
+        max_inflight=max_inflight,
+        max_tpm=max_tpm,
+        adaptive=adaptive,
+        min_qps=min_qps,
+        throttle_retries=throttle_retries,
+        shared_state=shared_state,
+    )
+
+
+@dataclass(frozen=True)
+class HedgeConfig:
+    percentile: Optional[float] = None
+    max_ratio: float = 0.1
+
+    @property
+    def enabled(self) -> bool:
+        return self.percentile is not None
+
+
+def load_hedge_config() -> HedgeConfig:
+    """Read CR_HEDGE_PERCENTILE (0~1, unset disables hedging) and CR_HEDGE_MAX_RATIO."""
+    percentile = _optional_env_number("CR_HEDGE_PERCENTILE", float)
+    if percentile is not None and percentile >= 1:
+        raise ValueError(f"CR_HEDGE_PERCENTILE must be between 0 and 1, got {percentile}")
+    max_ratio = _optional_env_number("CR_HEDGE_MAX_RATIO", float) or 0.1
+    return HedgeConfig(percentile=percentile, max_ratio=max_ratio)
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    directory: Optional[Path] = None
+    review_max_mb: float = 256.0
+    tagging_max_mb: float = 64.0
+    tagging_ttl: float = 7 * 24 * 3600.0
+    llm_mode: str = "off"
+    llm_max_mb: float = 256.0
+    llm_ttl: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+
+def load_cache_config() -> CacheConfig:
+    """Read CR_CACHE_DIR (unset disables on-disk caches) and per-cache size limits."""
+    directory = (os.getenv("CR_CACHE_DIR") or "").strip()
+    llm_mode = (os.getenv("CR_LLM_CACHE") or "off").strip().lower()
+    if llm_mode not in LLM_CACHE_MODES:
+        raise ValueError(f"CR_LLM_CACHE must be one of {', '.join(LLM_CACHE_MODES)}, got '{llm_mode}'")
+    if llm_mode != "off" and not directory:
+        raise ValueError("CR_LLM_CACHE requires CR_CACHE_DIR")
+    llm_ttl_hours = _optional_env_number("CR_LLM_CACHE_TTL_HOURS", float)
+    return CacheConfig(
+        directory=Path(directory).expanduser() if directory else None,
+        review_max_mb=_optional_env_number("CR_REVIEW_CACHE_MAX_MB", float) or 256.0,
+        tagging_max_mb=_optional_env_number("CR_TAGGING_CACHE_MAX_MB", float) or 64.0,
+        tagging_ttl=(_optional_env_number("CR_TAGGING_CACHE_TTL_HOURS", float) or 7 * 24) * 3600.0,
+        llm_mode=llm_mode,
+        llm_max_mb=_optional_env_number("CR_LLM_CACHE_MAX_MB", float) or 256.0,
+        llm_ttl=llm_ttl_hours * 3600.0 if llm_ttl_hours else None,
+    )
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    failure_threshold: int = 0
+    cooldown: float = 30.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+
+def load_breaker_config() -> BreakerConfig:
+    """Read CR_BREAKER_FAILURES (consecutive endpoint failures before opening; unset/0 disables) and CR_BREAKER_COOLDOWN."""
+    failures_raw = (os.getenv("CR_BREAKER_FAILURES") or "").strip()
+    try:
+        failure_threshold = max(0, int(failures_raw)) if failures_raw else 0
+    except ValueError as exc:
+        raise ValueError(f"CR_BREAKER_FAILURES must be an integer, got {failures_raw}") from exc
+    cooldown = _optional_env_number("CR_BREAKER_COOLDOWN", float) or 30.0
+    return BreakerConfig(failure_threshold=failure_threshold, cooldown=cooldown)
+
+
+@dataclass(frozen=True)
+class BudgetConfig:
+    max_calls: Optional[int] = None
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in (self.max_calls, self.max_tokens, self.max_cost))
+
+
+def load_budget_config() -> BudgetConfig:
+    """Read the per-run LLM budget (CR_BUDGET_MAX_CALLS / CR_BUDGET_MAX_TOKENS / CR_BUDGET_MAX_COST).
+
+    CR_BUDGET_MAX_COST only makes sense together with CR_COST_PER_1K_INPUT_TOKENS /
+    CR_COST_PER_1K_OUTPUT_TOKENS, which price the model in the same currency.
+    """
+    max_cost = _optional_env_number("CR_BUDGET_MAX_COST", float)
+    cost_in = _optional_env_number("CR_COST_PER_1K_INPUT_TOKENS", float) or 0.0
+    cost_out = _optional_env_number("CR_COST_PER_1K_OUTPUT_TOKENS", float) or 0.0
+    if max_cost is not None and not (cost_in or cost_out):
+        raise ValueError("CR_BUDGET_MAX_COST requires CR_COST_PER_1K_INPUT_TOKENS or CR_COST_PER_1K_OUTPUT_TOKENS")
+    return BudgetConfig(
+        max_calls=_optional_env_number("CR_BUDGET_MAX_CALLS", int),
+        max_tokens=_optional_env_number("CR_BUDGET_MAX_TOKENS", int),
+        max_cost=max_cost,
+        cost_per_1k_input=cost_in,
+        cost_per_1k_output=cost_out,
+    )
+
+
+@dataclass(frozen=True)
+class EndpointConfig:
+    name: str
+    base_url: str
+    api_key: str
+    model_name: str = DEFAULT_MODEL_NAME
+    weight: float = 1.0
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
+    temperature: float = DEFAULT_TEMPERATURE
+    timeout: int = DEFAULT_TIMEOUT
+
+
+_ENDPOINT_RATE_KEYS = {
+    "max_qps": float,
+    "max_burst": int,
+    "max_inflight": int,
+    "max_tpm": int,
+}
+
+
+def load_endpoint_configs(
+    path: Path,
+    *,
+    rate_limit: RateLimitConfig,
+    temperature: float = DEFAULT_TEMPERATURE,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> List[EndpointConfig]:
+    """Load the LLM endpoint pool from a YAML file (see CR_LLM_ENDPOINTS).
+
+    Each endpoint may give ``api_key`` directly or ``api_key_env`` naming an
+    environment variable; per-endpoint ``max_qps``/``max_burst``/``max_inflight``/
+    ``max_tpm`` override the global rate-limit settings.  ``temperature``/``timeout``
+    apply to every endpoint, matching load_openai_config for the single-endpoint setup.
+    """
+    from cr_agent.rules.loader import _load_yaml  # reuse minimal YAML loader
+
+    data = _load_yaml(Path(path).expanduser().resolve())
+    items = data.get("endpoints") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"{path}: endpoints 必须是非空列表")
+
+    default_model = os.getenv("MODEL_NAME", DEFAULT_MODEL_NAME)
+    endpoints: List[EndpointConfig] = []
+    for idx, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}: 第 {idx} 个端点必须是映射")
+        name = str(item.get("name") or f"endpoint-{idx}")
+        base_url = str(item.get("base_url") or "").strip()
+        api_key = str(item.get("api_key") or "").strip()
+        if not api_key and item.get("api_key_env"):
+            api_key = _require_env(str(item["api_key_env"]))
+        if not base_url or not api_key:
+            raise ValueError(f"{path}: 端点 {name} 缺少 base_url 或 api_key/api_key_env")
+
+        overrides = {}
+        for key, cast in _ENDPOINT_RATE_KEYS.items():
+            if item.get(key) is not None:
+                value = cast(item[key])
+                overrides[key] = value if value > 0 else None
+        if overrides.get("max_burst", 1) is None:
+            overrides["max_burst"] = 1
+        if rate_limit.shared_state:
+            # 每个端点是独立的配额，各自使用一份共享状态文件
+            overrides["shared_state"] = f"{rate_limit.shared_state}.{name}"
+
+        endpoints.append(
+            EndpointConfig(
+                name=name,
+                base_url=base_url,
+                api_key=api_key,
+                model_name=str(item.get("model") or default_model),
+                weight=float(item.get("weight") or 1.0),
+                rate_limit=replace(rate_limit, **overrides),
+                temperature=temperature,
+                timeout=timeout,
+            )
+        )
+    names = [ep.name for ep in endpoints]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path}: 端点 name 重复")
+    return endpoints
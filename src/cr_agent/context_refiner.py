@@ -7,7 +7,10 @@ from typing import Dict, List, Optional, Sequence, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field, ValidationError
 
+from cr_agent.budget import BudgetExceededError
+from cr_agent.circuit_breaker import CircuitOpenError
 from cr_agent.models import CommitDiff, CRIssue, FileCRResult, FileDiff, FileHunk
+from cr_agent.rate_limiter import DEFAULT_LLM_PRIORITIES, LLMThrottledError, llm_priority
 
 
 class _ContextRefineItem(BaseModel):
@@ -25,6 +28,7 @@ class ContextRefiner:
     min_hunk_lines: int = 30
     min_snippet_lines: int = 5
     max_snippet_lines: int = 10
+    priority: int = DEFAULT_LLM_PRIORITIES["refine"]
 
     def __post_init__(self) -> None:
         self._prompt = ChatPromptTemplate.from_messages(
@@ -76,15 +80,16 @@ class ContextRefiner:
         issues_payload: List[Dict[str, object]],
     ) -> None:
         try:
-            result = await self._chain.ainvoke(
-                {
-                    "hunk_text": hunk.text,
-                    "issues_json": json.dumps(issues_payload, ensure_ascii=False),
-                    "min_lines": self.min_snippet_lines,
-                    "max_lines": self.max_snippet_lines,
-                }
-            )
-        except (ValidationError, ValueError):
+            with llm_priority(self.priority):
+                result = await self._chain.ainvoke(
+                    {
+                        "hunk_text": hunk.text,
+                        "issues_json": json.dumps(issues_payload, ensure_ascii=False),
+                        "min_lines": self.min_snippet_lines,
+                        "max_lines": self.max_snippet_lines,
+                    }
+                )
+        except (ValidationError, ValueError, LLMThrottledError, BudgetExceededError, CircuitOpenError):
             return
         if not isinstance(result, _ContextRefineResult):
             return
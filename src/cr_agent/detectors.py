@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple, get_args
+
+from cr_agent.cache import text_digest
+from cr_agent.models import Category, CRIssue, FileDiff
+from cr_agent.rules import RuleMeta
+
+DOMAIN_CATEGORIES: Dict[str, str] = {
+    "STYLE": "style",
+    "ERROR": "reliability",
+    "API": "api",
+    "CONC": "concurrency",
+    "PERF": "performance",
+    "SEC": "security",
+    "TEST": "test",
+    "CONFIG": "build",
+}
+
+_RULE_SEVERITIES: Dict[str, str] = {"error": "major", "warning": "minor", "warn": "minor"}
+# 编号反向引用（\1..\9）在组合正则里会指向别的分组，带这种引用的 detector 单独匹配
+_NUMBERED_BACKREF = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+_MAX_SNIPPET_LINES = 3
+
+
+@dataclass(frozen=True)
+class DetectorHit:
+    rule: RuleMeta
+    hunk_id: int
+    lines: Tuple[str, ...]
+
+
+@dataclass
+class DetectorStats:
+    hits: int = 0
+    local_tags: int = 0
+    by_rule: Dict[str, int] = field(default_factory=dict)
+
+
+class RuleDetectors:
+    """规则 front-matter 中 ``detector`` 的本地执行器。
+
+    所有 detector 的正则合并为一个组合正则，每个新增行只匹配一次即可得到命中的全部规则，
+    再按文件 glob、前序行条件过滤。结果按 (规则, hunk) 聚合成带 rule_ids 的 CRIssue。
+    含编号反向引用或无法组合的正则不进组合正则，逐条匹配。
+    """
+
+    def __init__(self, rules: Iterable[RuleMeta]):
+        self.rules: Tuple[RuleMeta, ...] = tuple(
+            sorted((r for r in rules if r.detector is not None and not r.deprecated), key=lambda r: r.rule_id)
+        )
+        self._preceding = [
+            re.compile(r.detector.preceding) if r.detector.preceding else None  # type: ignore[union-attr]
+            for r in self.rules
+        ]
+        self._preceding_absent = [
+            re.compile(r.detector.preceding_absent) if r.detector.preceding_absent else None  # type: ignore[union-attr]
+            for r in self.rules
+        ]
+        self._window = max((r.detector.window for r in self.rules), default=1)  # type: ignore[union-attr]
+        self._combined, self._separate = self._compile([r.detector.pattern for r in self.rules])  # type: ignore[union-attr]
+        self.digest = text_digest(
+            "\n".join(f"{r.rule_id}:{r.language}:{','.join(r.domains)}:{r.detector!r}" for r in self.rules)
+        )
+        self.stats = DetectorStats()
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> Tuple[Optional[re.Pattern], List[Tuple[int, re.Pattern]]]:
+        """Return the combined regex and the (rule index, regex) pairs that must be matched one by one."""
+        combinable = [idx for idx, pattern in enumerate(patterns) if not _NUMBERED_BACKREF.search(pattern)]
+        separate = [(idx, re.compile(pattern)) for idx, pattern in enumerate(patterns) if _NUMBERED_BACKREF.search(pattern)]
+        if not combinable:
+            return None, separate
+        # 每个 detector 是一个可选的前瞻分组：一次 match 就能记录行内所有命中的 detector
+        combined = "".join(f"(?:(?=.*?(?P<d{idx}>{patterns[idx]})))?" for idx in combinable)
+        try:
+            return re.compile(combined), separate
+        except re.error:
+            # 带命名分组、全局 flag 等无法组合的正则，退回逐条匹配
+            return None, [(idx, re.compile(pattern)) for idx, pattern in enumerate(patterns)]
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def _match_line(self, line: str) -> List[int]:
+        matched: List[int] = []
+        if self._combined is not None:
+            match = self._combined.match(line)
+            if match is not None:
+                matched = [int(name[1:]) for name, value in match.groupdict().items() if value is not None]
+        matched.extend(idx for idx, pattern in self._separate if pattern.search(line))
+        return matched
+
+    def applicable(self, path: str, language: Optional[str]) -> List[int]:
+        basename = PurePosixPath(path).name
+        out: List[int] = []
+        for idx, rule in enumerate(self.rules):
+            detector = rule.detector
+            if rule.language and rule.language != language:
+                continue
+            if detector.files and not _glob_any(detector.files, path, basename):  # type: ignore[union-attr]
+                continue
+            if _glob_any(detector.exclude_files, path, basename):  # type: ignore[union-attr]
+                continue
+            out.append(idx)
+        return out
+
+    def scan(self, file_diff: FileDiff, *, language: Optional[str]) -> List[DetectorHit]:
+        """Run every applicable detector over the added lines of all hunks in one pass."""
+        if not self.rules:
+            return []
+        path = file_diff.b_path or file_diff.a_path or ""
+        active = set(self.applicable(path, language))
+        if not active:
+            return []
+        found: Dict[Tuple[int, int], List[str]] = {}
+        for hunk_id, hunk in enumerate(file_diff.hunks, start=1):
+            previous: List[str] = []
+            for raw in hunk.text.splitlines()[1:]:
+                if raw.startswith("-") or raw.startswith("\\"):
+                    continue
+                line = raw[1:] if raw[:1] in ("+", " ") else raw
+                if raw.startswith("+"):
+                    for idx in self._match_line(line):
+                        if idx in active and self._preceding_ok(idx, previous):
+                            found.setdefault((idx, hunk_id), []).append(line)
+                previous.append(line)
+                if len(previous) > self._window:
+                    previous.pop(0)
+        hits = [DetectorHit(self.rules[idx], hunk_id, tuple(lines)) for (idx, hunk_id), lines in sorted(found.items())]
+        for hit in hits:
+            self.stats.hits += 1
+            self.stats.by_rule[hit.rule.rule_id] = self.stats.by_rule.get(hit.rule.rule_id, 0) + 1
+        return hits
+
+    def _preceding_ok(self, idx: int, previous: List[str]) -> bool:
+        window = previous[-self.rules[idx].detector.window :] if previous else []  # type: ignore[union-attr]
+        required = self._preceding[idx]
+        if required is not None and not any(required.search(line) for line in window):
+            return False
+        absent = self._preceding_absent[idx]
+        if absent is not None and any(absent.search(line) for line in window):
+            return False
+        return True
+
+    @staticmethod
+    def to_issue(hit: DetectorHit, *, file_path: str, tag: str) -> CRIssue:
+        detector = hit.rule.detector
+        severity = str(hit.rule.severity or "minor").strip().lower()
+        severity = _RULE_SEVERITIES.get(severity, severity)
+        if severity not in ("info", "minor", "major", "critical"):
+            severity = "minor"
+        snippet = "\n".join(line.strip() for line in hit.lines[:_MAX_SNIPPET_LINES])
+        if len(hit.lines) > _MAX_SNIPPET_LINES:
+            snippet += f"\n...（共 {len(hit.lines)} 处）"
+        category = detector.category if detector.category in get_args(Category) else None  # type: ignore[union-attr]
+        return CRIssue(
+            severity=severity,  # type: ignore[arg-type]
+            category=(category or DOMAIN_CATEGORIES.get(tag, "other")),  # type: ignore[arg-type]
+            message=detector.message,  # type: ignore[union-attr]
+            file_path=file_path,
+            hunk_id=hit.hunk_id,
+            suggestion=detector.suggestion,  # type: ignore[union-attr]
+            context_snippet=snippet,
+            confidence=detector.confidence,  # type: ignore[union-attr]
+            rule_ids=[hit.rule.rule_id],
+        )
+
+
+def _glob_any(patterns: Iterable[str], path: str, basename: str) -> bool:
+    return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(basename, pattern) for pattern in patterns)
+
+
+__all__ = ["DOMAIN_CATEGORIES", "DetectorHit", "DetectorStats", "RuleDetectors"]
@@ -6,33 +6,55 @@ import operator
 import re
 import time
 from pathlib import Path
-from typing import Annotated, Iterable, List, Optional, TypedDict, cast
+from types import MappingProxyType
+from typing import Annotated, Iterable, List, Mapping, Optional, Tuple, TypedDict, cast
 
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool
 from langgraph.graph import END, START, StateGraph
 from pydantic import ValidationError
 from cr_agent.agents import ReactDomainAgent, StaticPromptBuilder
-from cr_agent.rate_limiter import AsyncRateLimiter, NoopRateLimiter, RateLimiterProtocol, RateLimitedLLM
+from cr_agent.budget import BudgetExceededError, RunBudget
+from cr_agent.cache import SQLiteCache, cache_key, text_digest
+from cr_agent.circuit_breaker import CircuitOpenError
+from cr_agent.hedging import HedgePolicy
+from cr_agent.rate_limiter import (
+    DEFAULT_LLM_PRIORITIES,
+    DEFAULT_PRIORITY,
+    LLMThrottledError,
+    NoopRateLimiter,
+    RateLimiterProtocol,
+    RateLimitedLLM,
+    estimate_tokens,
+    llm_priority,
+)
 
+from cr_agent.detectors import RuleDetectors
 from cr_agent.models import (
+    BatchFileTaggingLLMResult,
+    CRIssue,
     FileCRResult,
     FileDiff,
     FileTaggingLLMResult,
     FileTaggingResult,
+    FusedTagCRLLMResult,
     Tag,
     TagCRLLMResult,
     TagCRLLMResultFallback,
     TagCRResult,
 )
-from cr_agent.rules import RULE_DOMAINS, RuleMeta, get_rules_catalog
+from cr_agent.pretagger import PreTagger, PreTaggerStats
+from cr_agent.rules import RULE_DOMAINS, RuleMeta, get_rule_doc_store, get_rules_catalog
 from tools.standard_tools import code_standard_doc
 
 __all__ = ["FileReviewEngine"]
 
 BLACKLIST_PATTERNS: tuple[re.Pattern, ...] = tuple()
 
+# 预算紧张时只保留优先级数值低于该阈值的标签（默认即 SEC/CONC/ERROR/API/PERF/CONFIG）
+LOW_PRIORITY_TAG_CUTOFF = 30
+
 TAG_DESCRIPTIONS: dict[Tag, str] = {
     "STYLE": "风格/可读性（命名、结构、注释、可维护性）",
     "ERROR": "错误处理（边界、异常、返回值、降级、日志）",
@@ -45,6 +67,27 @@ TAG_DESCRIPTIONS: dict[Tag, str] = {
 }
 
 
+# 同一 (tag, language) 的系统提示与规范逐字节相同，构成可被模型服务端缓存的前缀；
+# 每个文件只有 user 消息中的 diff 不同。
+TAG_REVIEW_STANDARDS_TEMPLATE = (
+    "\n适用代码规范（language={language}, domain={tag}）：\n{standards}\n"
+    "需要时可以调用可用工具（若规范提供文档，可用 code_standard_doc(rule_id) 查看细节）。\n"
+)
+
+TAG_REVIEW_USER_TEMPLATE = (
+    "请针对下列文件 diff（hunk 列表）执行专项代码审查，并仅关注本标签相关的问题。\n"
+    "输入(JSON)：\n"
+    "{payload_json}"
+)
+
+
+FUSED_REVIEW_USER_TEMPLATE = (
+    "请针对下列文件 diff（hunk 列表）一次性完成上述各标签的专项代码审查，每个标签输出一个 section。\n"
+    "输入(JSON)：\n"
+    "{payload_json}"
+)
+
+
 TAG_TOOLS: dict[Tag, List] = {
     "STYLE": [],
     "ERROR": [],
@@ -64,6 +107,9 @@ class FileReviewState(TypedDict):
     tag_results: Annotated[List[TagCRResult], operator.add]
     file_cr_result: Optional[FileCRResult]
     skip: bool
+    context_lines: Optional[int]
+    payload_json: Optional[str]
+    detector_issues: dict[str, List[CRIssue]]
 
 
 class FileReviewEngine:
@@ -78,21 +124,85 @@ class FileReviewEngine:
         allowed_tags: Optional[tuple[Tag, ...]] = None,
         blacklist_patterns: Optional[tuple[re.Pattern, ...]] = None,
         blacklist_basenames: Optional[Iterable[str]] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        priorities: Optional[Mapping[str, int]] = None,
+        budget: Optional[RunBudget] = None,
+        review_cache: Optional[SQLiteCache] = None,
+        tagging_cache: Optional[SQLiteCache] = None,
+        cached_llm=None,
+        fused_max_lines: int = 0,
+        tag_batch_max_tokens: int = 0,
+        pretagger: Optional[PreTagger] = None,
+        rule_detectors: bool = True,
+        max_review_chunks: int = 1,
     ):
+        if rate_limiter is not None and not isinstance(llm, RateLimitedLLM):
+            llm = RateLimitedLLM(llm, rate_limiter)
         self.llm = llm
+        # 可安全重放的单次调用（打标链、no-tools 兜底）走响应缓存，多步 ReAct agent 不走
+        self.cached_llm = cached_llm or llm
         self.max_patch_chars = max_patch_chars
+        # 超过 max_patch_chars 的大文件按 hunk 切成至多该数量的分段并行审查；1 表示只截断不分段
+        self.max_review_chunks = max(1, max_review_chunks)
+        self.chunked_calls = 0
         self.rate_limiter = rate_limiter or NoopRateLimiter()
         self.enabled_tags: tuple[Tag, ...] = allowed_tags or cast(tuple[Tag, ...], RULE_DOMAINS)
         self.blacklist_patterns: tuple[re.Pattern, ...] = blacklist_patterns or ()
         self.blacklist_basenames = {name.strip() for name in (blacklist_basenames or []) if name and name.strip()}
-        self.prepare = RunnableLambda(lambda fd, engine=self: {"payload_json": json.dumps(engine._prepare_payload(fd), ensure_ascii=False)})
+        self.hedge_policy = hedge_policy
+        self.priorities: dict[str, int] = {**DEFAULT_LLM_PRIORITIES, **(priorities or {})}
+        self.budget = budget
+        self.review_cache = review_cache
+        self.tagging_cache = tagging_cache
+        # 改动行数不超过该值的小文件，多个标签合并为一次结构化调用审查；0 表示关闭
+        self.fused_max_lines = max(0, fused_max_lines)
+        self.fused_calls = 0
+        self.fused_tags = 0
+        self.fused_fallbacks = 0
+        self._fused_prompts: dict[Tuple[Tuple[Tag, ...], Optional[str]], str] = {}
+        # 批量打标：多个小文件的输入合并为一次打标调用，单次请求的输入 token 不超过该值；0 表示关闭
+        self.tag_batch_max_tokens = max(0, tag_batch_max_tokens)
+        self._prefetched_tags: dict[str, FileTaggingLLMResult] = {}
+        self.pretagger = pretagger
+        self.pretagger_stats = PreTaggerStats()
+        self.batch_tag_calls = 0
+        self.batch_tagged_files = 0
+        self.model_name = self._model_name(llm)
+        # 规则 front-matter 中的 detector 在本地执行；标签下全是 detector-only 规则时不再调用 LLM
+        self.detectors = self._build_detectors() if rule_detectors else RuleDetectors(())
+        self._detector_only_cache: dict[Tuple[Tag, Optional[str]], bool] = {}
+        self._rule_blocks = self._build_rule_blocks()
+        self._rule_block_digests = self._build_rule_block_digests()
         self.tagger_prompt = self._build_tagger_prompt()
+        self._tagger_prompt_digest = text_digest(
+            "\n".join(getattr(getattr(m, "prompt", None), "template", "") for m in self.tagger_prompt.messages)
+        )
         self.tagger_chain = self._build_tagger_chain()
-        self.tag_agents = self._build_tag_agents()
-        self.tag_agents_lenient: dict[Tag, ReactDomainAgent] = {}
+        self.batch_tagger_prompt = self._build_batch_tagger_prompt()
+        self._batch_tagger_prompt_digest = text_digest(
+            "\n".join(getattr(getattr(m, "prompt", None), "template", "") for m in self.batch_tagger_prompt.messages)
+        )
+        self.batch_tagger_chain = self._build_batch_tagger_chain()
+        self.tag_agents: dict[Tuple[Tag, Optional[str]], ReactDomainAgent] = {}
+        self.tag_agents_lenient: dict[Tuple[Tag, Optional[str]], ReactDomainAgent] = {}
+        self._tag_prompt_digests = {
+            tag: text_digest(self._build_tag_agent_prompt(tag) + TAG_REVIEW_STANDARDS_TEMPLATE + TAG_REVIEW_USER_TEMPLATE)
+            for tag in self.enabled_tags
+        }
+        # 整个文件结果的复用（增量审查、补丁指纹）依赖的全部配置：模型、启用标签、prompt 与规则
+        self.review_config_digest = cache_key(
+            self.model_name,
+            self.max_patch_chars,
+            self.max_review_chunks,
+            self._tagger_prompt_digest,
+            self._batch_tagger_prompt_digest,
+            sorted(self._tag_prompt_digests.items()),
+            sorted(self._rule_block_digests.values()),
+            self.detectors.digest,
+        )
         self.file_graph = self._build_file_review_graph()
 
-    async def review_file(self, file_diff: FileDiff) -> FileCRResult:
+    async def review_file(self, file_diff: FileDiff, *, context_lines: Optional[int] = None) -> FileCRResult:
         state = await self.file_graph.ainvoke(
             {
                 "file_diff": file_diff,
@@ -101,6 +211,9 @@ class FileReviewEngine:
                 "tag_results": [],
                 "file_cr_result": None,
                 "skip": False,
+                "context_lines": context_lines,
+                "payload_json": None,
+                "detector_issues": {},
             }
         )
         result = state.get("file_cr_result")
@@ -112,6 +225,83 @@ class FileReviewEngine:
             )
         return result
 
+    async def prefetch_tags(self, file_diffs: Iterable[FileDiff]) -> None:
+        """Tag small files in batched calls ahead of the per-file graphs.
+
+        Results are handed to ``_tag_file_diff`` by payload; files a batch misses
+        (or whose batch fails) are tagged individually as before.
+        """
+        if not self.tag_batch_max_tokens:
+            return
+        per_file_limit = self.tag_batch_max_tokens // 2
+        candidates: List[Tuple[str, str, int]] = []
+        for file_diff in file_diffs:
+            if self._matches_blacklist(file_diff) or file_diff.is_binary or not file_diff.hunks:
+                continue
+            if self._pretag(file_diff) is not None:
+                continue
+            payload_json = self._payload_json(file_diff)
+            key = self._tagging_key(payload_json)
+            if key in self._prefetched_tags:
+                continue
+            if self.tagging_cache is not None and (
+                self.tagging_cache.get_json(key) is not None
+                or self.tagging_cache.get_json(self._batch_tagging_key(payload_json)) is not None
+            ):
+                continue
+            tokens = estimate_tokens(payload_json)
+            if tokens <= per_file_limit:
+                candidates.append((self._file_path(file_diff), payload_json, tokens))
+
+        batches: List[List[Tuple[str, str, int]]] = []
+        current: List[Tuple[str, str, int]] = []
+        used = 0
+        for item in candidates:
+            if current and used + item[2] > self.tag_batch_max_tokens:
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += item[2]
+        if current:
+            batches.append(current)
+        # 只有一个文件的批次没有收益，留给单文件打标
+        await asyncio.gather(*(self._tag_batch(batch) for batch in batches if len(batch) > 1))
+
+    def discard_prefetched_tags(self) -> None:
+        """Drop batch answers no file consumed (e.g. the file was skipped or answered from stored results)."""
+        self._prefetched_tags.clear()
+
+    async def _tag_batch(self, batch: List[Tuple[str, str, int]]) -> None:
+        payloads = {path: payload_json for path, payload_json, _ in batch}
+        self.batch_tag_calls += 1
+        try:
+            with llm_priority(self._priority_for("tagger")):
+                result = await self.batch_tagger_chain.ainvoke(
+                    {"payloads_json": "[\n" + ",\n".join(payloads.values()) + "\n]"}
+                )
+            if result is None:
+                return  # 结构化输出解析失败：按整批未命中处理
+            for item in result.files:
+                payload_json = payloads.pop(item.file_path, None)
+                if payload_json is None:
+                    continue
+                llm_result = FileTaggingLLMResult(tags=item.tags, reasoning=item.reasoning)
+                self._prefetched_tags[self._tagging_key(payload_json)] = llm_result
+                if self.tagging_cache is not None:
+                    # 批量答案来自另一份 prompt，用批量 prompt 的摘要单独建 key，不冒充单文件打标结果
+                    self.tagging_cache.set_json(
+                        self._batch_tagging_key(payload_json), llm_result.model_dump(mode="json")
+                    )
+                self.batch_tagged_files += 1
+        except Exception:
+            return  # 整批失败时各文件回退到单文件打标（限流、熔断、预算在那里统一处理）
+
+    def reviewed_hunk_ids(self, file_diff: FileDiff) -> set[int]:
+        """hunk_ids sent to the tag agents in full; the rest are cut by max_patch_chars / max_review_chunks."""
+        chunks = self._review_chunks(file_diff)
+        payloads = [self._serialize_hunks(file_diff, chunk) for chunk in chunks] if chunks else [self._serialize_hunks(file_diff)]
+        return {hunk["hunk_id"] for payload in payloads for hunk in payload if not hunk["truncated"]}
+
     # ------------------------------------------------------------------ #
     # 构建链路
     # ------------------------------------------------------------------ #
@@ -183,7 +373,7 @@ class FileReviewEngine:
             "   - rule_ids: [对应规则]；若无规则支撑则输出 []\n"
             "   - severity: 按规范或你的风险判断\n"
             "   - suggestion: 可执行的修复建议（可选，避免大重构）\n"
-            "   - hunk_id: 指向所属 hunk（整数，从 1 开始，按输入列表顺序）\n"
+            "   - hunk_id: 所属 hunk 在输入中的 hunk_id 字段（整数，从 1 开始）\n"
             "   - confidence: 0~1 之间的小数（可选）\n"
             "\n"
             "输出要求（必须严格满足）：\n"
@@ -196,41 +386,156 @@ class FileReviewEngine:
             "- 在给出结构化输出前，如需要可多次调用工具收集规则原文信息。\n"
         )
 
+    def _build_batch_tagger_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "你是一名代码变更标签分类器。\n"
+                    "输入是多个文件的 diff（每个元素是一个文件，按 hunk 组织），请分别为每个文件分配 0~多个标签（可多选）：\n"
+                    "- STYLE  风格/可读性\n"
+                    "- API    接口设计\n"
+                    "- TEST   测试\n"
+                    "- CONFIG 配置/依赖\n\n"
+                    "要求：\n"
+                    "- 只从上述标签中选择，不要输出其它标签。\n"
+                    "- 每个文件独立判断，互不影响；有代码变更必须包含 STYLE。\n"
+                    "- files 中为每个输入文件输出一项，file_path 必须与输入中的 file_path 完全一致。\n"
+                    "- 输出必须严格符合 BatchFileTaggingLLMResult 结构化模式；所有说明使用中文。\n"
+                    "- 只输出原始 JSON，不要使用 Markdown 代码块，不要添加多余文字。",
+                ),
+                (
+                    "human",
+                    "请对以下多个文件 diff 分别打标签。\n"
+                    "输入(JSON 数组)：\n{payloads_json}",
+                ),
+            ]
+        )
+
+    def _build_batch_tagger_chain(self):
+        return self.batch_tagger_prompt | self.cached_llm.with_structured_output(BatchFileTaggingLLMResult)
+
     def _build_tagger_chain(self):
-        return (self.prepare | self.tagger_prompt | self.llm.with_structured_output(FileTaggingLLMResult)).with_retry(
+        return (self.tagger_prompt | self.cached_llm.with_structured_output(FileTaggingLLMResult)).with_retry(
             stop_after_attempt=3,
             retry_if_exception_type=(ValidationError, ValueError),
         )
 
-    def _build_tag_agents(self) -> dict[Tag, ReactDomainAgent]:
-        agents: dict[Tag, ReactDomainAgent] = {}
-        for tag in self.enabled_tags:
-            prompt_builder = StaticPromptBuilder(self._build_tag_agent_prompt(tag))
-            tools = self._tools_for_tag(tag)
-            agents[tag] = ReactDomainAgent(
+    def _build_rule_blocks(self) -> Mapping[Tuple[Optional[str], Tag], str]:
+        """Render the standards text for every (language, domain) once; None is the cross-language fallback.
+
+        Rule documents are preloaded into the shared doc store here as well, so
+        code_standard_doc calls made by the tag agents never touch the disk.
+        """
+        try:
+            catalog = get_rules_catalog()
+            languages: List[Optional[str]] = [None, *catalog.by_language_domain.keys()]
+            get_rule_doc_store().preload(meta.doc_path for meta in catalog.by_id.values())
+        except Exception:
+            languages = [None]
+        return MappingProxyType(
+            {
+                (language, tag): self._format_rules_for_prompt(self._prompt_rules(tag=tag, language=language))
+                for language in languages
+                for tag in self.enabled_tags
+            }
+        )
+
+    def _build_rule_block_digests(self) -> dict[str, str]:
+        """Digest of each standards block plus the Markdown bodies behind it.
+
+        Agents read rule documents through code_standard_doc, so editing a rule's body
+        must invalidate cached reviews even when the rendered block is unchanged.
+        """
+        digests: dict[str, str] = {}
+        for (language, tag), block in self._rule_blocks.items():
+            if block in digests:
+                continue
+            rules = self._prompt_rules(tag=tag, language=language)
+            digests[block] = cache_key(block, [self._rule_doc_digest(meta) for meta in rules])
+        return digests
+
+    @staticmethod
+    def _rule_doc_digest(meta: RuleMeta) -> Optional[str]:
+        if not meta.doc_path:
+            return None
+        try:
+            # 与 code_standard_doc 读取同一份（已预加载、截断后的）文本
+            return text_digest(get_rule_doc_store().read(meta.doc_path))
+        except OSError:
+            return "missing"
+
+    @staticmethod
+    def _build_detectors() -> RuleDetectors:
+        try:
+            return RuleDetectors(get_rules_catalog().by_id.values())
+        except Exception:
+            return RuleDetectors(())
+
+    def _prompt_rules(self, *, tag: Tag, language: Optional[str]) -> List[RuleMeta]:
+        """Rules injected into the prompt; detector-only rules are checked locally and left out."""
+        rules = self._get_rules_for(tag=tag, language=language)
+        if not self.detectors:
+            return rules
+        return [rule for rule in rules if not rule.detector_only]
+
+    def _detector_only(self, tag: Tag, language: Optional[str]) -> bool:
+        """True when every rule of (tag, language) is detector-only, so the tag needs no LLM call."""
+        if not self.detectors or language is None:
+            return False
+        key = (tag, language)
+        cached = self._detector_only_cache.get(key)
+        if cached is None:
+            rules = self._get_rules_for(tag=tag, language=language)
+            cached = bool(rules) and all(rule.detector_only for rule in rules)
+            self._detector_only_cache[key] = cached
+        return cached
+
+    def _rules_block(self, tag: Tag, language: Optional[str]) -> str:
+        block = self._rule_blocks.get((language, tag))
+        if block is None:
+            block = self._rule_blocks.get((None, tag))
+        if block is None:
+            block = self._format_rules_for_prompt(self._prompt_rules(tag=tag, language=language))
+        return block
+
+    def _build_tag_system_prompt(self, tag: Tag, language: Optional[str], standards_text: str) -> str:
+        """Tag prompt followed by the (tag, language) standards: the stable, cacheable prompt prefix."""
+        return self._build_tag_agent_prompt(tag) + TAG_REVIEW_STANDARDS_TEMPLATE.format(
+            language=language or "unknown",
+            tag=tag,
+            standards=standards_text,
+        )
+
+    def _get_tag_agent(self, tag: Tag, language: Optional[str], standards_text: str) -> ReactDomainAgent:
+        agent = self.tag_agents.get((tag, language))
+        if agent is None:
+            system_prompt = self._build_tag_system_prompt(tag, language, standards_text)
+            # 结构化输出步骤只看 state 中的消息，显式带上同一份 system prompt，保留标签与规范上下文
+            agent = ReactDomainAgent(
                 llm=self.llm,
-                prompt_builder=prompt_builder,
-                tools=tools,
-                response_format=TagCRLLMResult,
+                prompt_builder=StaticPromptBuilder(system_prompt),
+                tools=self._tools_for_tag(tag),
+                response_format=(system_prompt, TagCRLLMResult),
                 name=f"tag-{tag}",
                 rate_limiter=self.rate_limiter,
             )
-        return agents
+            self.tag_agents[(tag, language)] = agent
+        return agent
 
-    def _get_tag_agent_lenient(self, tag: Tag) -> ReactDomainAgent:
-        agent = self.tag_agents_lenient.get(tag)
+    def _get_tag_agent_lenient(self, tag: Tag, language: Optional[str], standards_text: str) -> ReactDomainAgent:
+        agent = self.tag_agents_lenient.get((tag, language))
         if agent is None:
-            prompt_builder = StaticPromptBuilder(self._build_tag_agent_prompt(tag))
-            tools = self._tools_for_tag(tag)
+            system_prompt = self._build_tag_system_prompt(tag, language, standards_text)
             agent = ReactDomainAgent(
                 llm=self.llm,
-                prompt_builder=prompt_builder,
-                tools=tools,
-                response_format=TagCRLLMResultFallback,
+                prompt_builder=StaticPromptBuilder(system_prompt),
+                tools=self._tools_for_tag(tag),
+                response_format=(system_prompt, TagCRLLMResultFallback),
                 name=f"tag-{tag}-lenient",
                 rate_limiter=self.rate_limiter,
             )
-            self.tag_agents_lenient[tag] = agent
+            self.tag_agents_lenient[(tag, language)] = agent
         return agent
 
     def _build_file_review_graph(self):
@@ -247,7 +552,13 @@ class FileReviewEngine:
 
         g.add_edge(START, "guard_file")
         g.add_conditional_edges("guard_file", self._route_after_guard, {"skip": END, "continue": "tag_file"})
-        g.add_conditional_edges("tag_file", self._route_by_tags, {tag: f"review_{tag}" for tag in self.enabled_tags})
+        g.add_node("review_fused", self._review_fused_node)
+        g.add_edge("review_fused", "maybe_finalize")
+        g.add_conditional_edges(
+            "tag_file",
+            self._route_by_tags,
+            {**{tag: f"review_{tag}" for tag in self.enabled_tags}, "fused": "review_fused"},
+        )
         g.add_edge("tag_file", "maybe_finalize")
         g.add_edge("maybe_finalize", END)
         return g.compile()
@@ -288,25 +599,95 @@ class FileReviewEngine:
                     summary="补丁为空或不可解析，跳过自动审查，请人工确认。",
                 ),
             }
-        return {"skip": False}
+        return {"skip": False, "payload_json": self._payload_json(fd)}
 
     async def _tag_file_node(self, state: FileReviewState):
-        tagging = await self._tag_file_diff(state["file_diff"])
-        return {"tags": tagging.tags, "tagging_reasoning": tagging.reasoning}
+        fd = state["file_diff"]
+        if self._budget_level() == "exhausted":
+            return self._budget_skip_file(fd)
+        try:
+            tagging = await self._tag_file_diff(fd, payload_json=state.get("payload_json"))
+        except LLMThrottledError:
+            return {
+                "tags": [],
+                "file_cr_result": self._skip_file_result(
+                    fd,
+                    reason="llm_throttled",
+                    summary="LLM 服务持续限流，未能完成打标，请人工确认。",
+                ),
+            }
+        except BudgetExceededError:
+            return self._budget_skip_file(fd)
+        except CircuitOpenError:
+            return {
+                "tags": [],
+                "file_cr_result": self._skip_file_result(
+                    fd,
+                    reason="llm_circuit_open",
+                    summary="LLM 端点连续失败已熔断，未能完成打标，请人工确认。",
+                ),
+            }
+
+        tags, detector_issues = self._detect(fd, tagging.tags)
+        dropped = self._budget_dropped_tags(tags)
+        return {
+            "tags": tags,
+            "tagging_reasoning": tagging.reasoning,
+            "detector_issues": detector_issues,
+            "tag_results": [
+                self._with_detector_issues(self._budget_skipped_tag_result(fd, tag), detector_issues.get(tag))
+                for tag in dropped
+            ],
+        }
 
     def _route_after_guard(self, state: FileReviewState):
         return "skip" if state.get("skip") else "continue"
 
     def _route_by_tags(self, state: FileReviewState):
-        return [t for t in state.get("tags", []) if t in self.enabled_tags]
+        pending = self._pending_tags(state)
+        language = self._infer_language(state["file_diff"])
+        local = [tag for tag in pending if self._detector_only(tag, language)]
+        remote = [tag for tag in pending if tag not in local]
+        if len(remote) > 1 and self._fused_eligible(state["file_diff"]):
+            return ["fused", *local]
+        return pending
+
+    def _pending_tags(self, state: FileReviewState) -> List[Tag]:
+        done = {tr.tag for tr in state.get("tag_results", [])}
+        return [t for t in state.get("tags", []) if t in self.enabled_tags and t not in done]
+
+    def _fused_eligible(self, file_diff: FileDiff) -> bool:
+        if not self.fused_max_lines:
+            return False
+        if file_diff.added_lines + file_diff.deleted_lines > self.fused_max_lines:
+            return False
+        return self._review_chunks(file_diff) is None
 
     def _make_tag_reviewer_node(self, tag: Tag):
         async def _node(state: FileReviewState):
-            result = await self._review_tag(state["file_diff"], tag)
+            result = await self._review_tag(
+                state["file_diff"],
+                tag,
+                context_lines=state.get("context_lines"),
+                payload_json=state.get("payload_json"),
+                detector_issues=(state.get("detector_issues") or {}).get(tag),
+            )
             return {"tag_results": [result]}
 
         return _node
 
+    async def _review_fused_node(self, state: FileReviewState):
+        language = self._infer_language(state["file_diff"])
+        tags = [tag for tag in self._pending_tags(state) if not self._detector_only(tag, language)]
+        detector_issues = state.get("detector_issues") or {}
+        results = await self._review_tags_fused(
+            state["file_diff"],
+            tags,
+            context_lines=state.get("context_lines"),
+            payload_json=state.get("payload_json"),
+        )
+        return {"tag_results": [self._with_detector_issues(r, detector_issues.get(r.tag)) for r in results]}
+
     def _maybe_finalize(self, state: FileReviewState):
         if state.get("file_cr_result") is not None:
             return {}
@@ -330,9 +711,14 @@ class FileReviewEngine:
     # 具体动作
     # ------------------------------------------------------------------ #
 
-    def _prepare_payload(self, file_diff: FileDiff) -> dict:
-        hunks_payload = self._serialize_hunks(file_diff)
-        return {
+    def _prepare_payload(
+        self,
+        file_diff: FileDiff,
+        hunk_indices: Optional[List[int]] = None,
+        chunk: Optional[Tuple[int, int]] = None,
+    ) -> dict:
+        hunks_payload = self._serialize_hunks(file_diff, hunk_indices)
+        payload = {
             "file_path": self._file_path(file_diff),
             "change_type": file_diff.change_type,
             "is_binary": file_diff.is_binary,
@@ -343,10 +729,77 @@ class FileReviewEngine:
             "rename_from": file_diff.rename_from,
             "rename_to": file_diff.rename_to,
         }
+        if chunk is not None:
+            payload["chunk"] = {
+                "index": chunk[0],
+                "total": chunk[1],
+                "note": "大文件分段审查：本段只包含部分 hunk，hunk_id 为其在整个文件中的编号",
+            }
+        return payload
+
+    def _payload_json(self, file_diff: FileDiff) -> str:
+        return json.dumps(self._prepare_payload(file_diff), ensure_ascii=False)
 
-    async def _tag_file_diff(self, file_diff: FileDiff) -> FileTaggingResult:
-        async with self.rate_limiter:
-            llm_result: FileTaggingLLMResult = await self.tagger_chain.ainvoke(file_diff)
+    def _review_chunks(self, file_diff: FileDiff) -> Optional[List[List[int]]]:
+        """Split the hunks into consecutive chunks of at most max_patch_chars each.
+
+        Returns None when the file fits in one payload or chunking is off. A hunk
+        larger than max_patch_chars forms its own (truncated) chunk; hunks beyond
+        max_review_chunks chunks stay unreviewed, as with plain truncation.
+        """
+        if self.max_review_chunks <= 1 or sum(len(h.text) for h in file_diff.hunks) <= self.max_patch_chars:
+            return None
+        chunks: List[List[int]] = []
+        used = 0
+        for idx, hunk in enumerate(file_diff.hunks):
+            size = len(hunk.text)
+            if not chunks or used + size > self.max_patch_chars:
+                if len(chunks) == self.max_review_chunks:
+                    break
+                chunks.append([])
+                used = 0
+            chunks[-1].append(idx)
+            used += size
+        return chunks
+
+    def _pretag(self, file_diff: FileDiff):
+        if self.pretagger is None:
+            return None
+        decision = self.pretagger.decide(file_diff)
+        return decision if decision is not None and decision.conclusive else None
+
+    async def _tag_file_diff(self, file_diff: FileDiff, *, payload_json: Optional[str] = None) -> FileTaggingResult:
+        if self.pretagger is not None:
+            decision = self.pretagger.decide(file_diff)
+            if decision is None or not decision.conclusive:
+                self.pretagger_stats.record(decision)
+            else:
+                payload_json = payload_json or self._payload_json(file_diff)
+                self.pretagger_stats.record(decision, cached=self._has_cached_tags(payload_json))
+                return FileTaggingResult(
+                    file_path=self._file_path(file_diff),
+                    tags=self._filter_enabled_tags(self._normalize_tags(decision.tags)),
+                    reasoning=decision.reasoning,
+                )
+        payload_json = payload_json or self._payload_json(file_diff)
+        key = None
+        llm_result: Optional[FileTaggingLLMResult] = self._prefetched_tags.pop(self._tagging_key(payload_json), None)
+        if llm_result is None and self.tagging_cache is not None:
+            key = self._tagging_key(payload_json)
+            for cache_lookup in (key, self._batch_tagging_key(payload_json)):
+                cached = self.tagging_cache.get_json(cache_lookup)
+                if cached is None:
+                    continue
+                try:
+                    llm_result = FileTaggingLLMResult.model_validate(cached)
+                    break
+                except ValidationError:
+                    llm_result = None
+        if llm_result is None:
+            with llm_priority(self._priority_for("tagger")):
+                llm_result = await self.tagger_chain.ainvoke({"payload_json": payload_json})
+            if key is not None:
+                self.tagging_cache.set_json(key, llm_result.model_dump(mode="json"))  # type: ignore[union-attr]
 
         tags = self._normalize_tags(llm_result.tags)
         if file_diff.hunks and not tags:
@@ -355,31 +808,250 @@ class FileReviewEngine:
 
         return FileTaggingResult(file_path=self._file_path(file_diff), tags=tags, reasoning=llm_result.reasoning)
 
-    async def _review_tag(self, file_diff: FileDiff, tag: Tag) -> TagCRResult:
+    def _has_cached_tags(self, payload_json: str) -> bool:
+        """Whether the LLM tagging path would have been served without a call (used for pre-tagger stats only)."""
+        key = self._tagging_key(payload_json)
+        if key in self._prefetched_tags:
+            return True
+        if self.tagging_cache is None:
+            return False
+        return (
+            self.tagging_cache.get_json(key) is not None
+            or self.tagging_cache.get_json(self._batch_tagging_key(payload_json)) is not None
+        )
+
+    def _tagging_key(self, payload_json: str) -> str:
+        return cache_key("tagging", payload_json, self._tagger_prompt_digest, self.model_name)
+
+    def _batch_tagging_key(self, payload_json: str) -> str:
+        return cache_key("tagging_batch", payload_json, self._batch_tagger_prompt_digest, self.model_name)
+
+    async def _review_tag(
+        self,
+        file_diff: FileDiff,
+        tag: Tag,
+        *,
+        context_lines: Optional[int] = None,
+        payload_json: Optional[str] = None,
+        detector_issues: Optional[List[CRIssue]] = None,
+    ) -> TagCRResult:
         language = self._infer_language(file_diff)
-        standards = self._get_rules_for(tag=tag, language=language)
-        standards_text = self._format_rules_for_prompt(standards)
-
-        payload_json = json.dumps(self._prepare_payload(file_diff), ensure_ascii=False)
-        user_message = (
-            "请针对下列文件 diff（hunk 列表）执行专项代码审查，并仅关注本标签相关的问题。\n"
-            f"适用代码规范（language={language or 'unknown'}, domain={tag}）：\n{standards_text}\n"
-            "需要时可以调用可用工具（若规范提供文档，可用 code_standard_doc(rule_id) 查看细节）。\n"
-            "输入(JSON)：\n"
-            f"{payload_json}"
+        if self._detector_only(tag, language):
+            self.detectors.stats.local_tags += 1
+            return self._detector_tag_result(file_diff, tag, detector_issues or [])
+        result = await self._review_tag_llm(
+            file_diff, tag, language=language, context_lines=context_lines, payload_json=payload_json
+        )
+        return self._with_detector_issues(result, detector_issues)
+
+    async def _review_tag_llm(
+        self,
+        file_diff: FileDiff,
+        tag: Tag,
+        *,
+        language: Optional[str],
+        context_lines: Optional[int],
+        payload_json: Optional[str],
+    ) -> TagCRResult:
+        standards_text = self._rules_block(tag, language)
+        key = self._review_cache_key(file_diff, tag, context_lines=context_lines, standards_text=standards_text)
+        if key is not None:
+            cached = self.review_cache.get_json(key)  # type: ignore[union-attr]
+            if cached is not None:
+                try:
+                    return TagCRResult.model_validate(cached)
+                except ValidationError:
+                    pass
+        chunks = self._review_chunks(file_diff)
+        with llm_priority(self._priority_for(tag)):
+            if chunks:
+                result = await self._review_tag_chunked(
+                    file_diff, tag, language=language, standards_text=standards_text, chunks=chunks
+                )
+            else:
+                result = await self._review_tag_prioritized(
+                    file_diff,
+                    tag,
+                    language=language,
+                    standards_text=standards_text,
+                    payload_json=payload_json or self._payload_json(file_diff),
+                )
+        # 降级/兜底产生的结果不写缓存，下次运行重新审查
+        if key is not None and not result.meta.get("fallback_reason"):
+            self.review_cache.set_json(key, result.model_dump(mode="json"))  # type: ignore[union-attr]
+        return result
+
+    def _review_cache_key(
+        self,
+        file_diff: FileDiff,
+        tag: Tag,
+        *,
+        context_lines: Optional[int],
+        standards_text: str,
+    ) -> Optional[str]:
+        if self.review_cache is None or not (file_diff.a_blob_sha or file_diff.b_blob_sha):
+            return None
+        return cache_key(
+            "tag_review",
+            file_diff.a_blob_sha,
+            file_diff.b_blob_sha,
+            context_lines,
+            self._file_path(file_diff),
+            self.max_patch_chars,
+            self.max_review_chunks,
+            tag,
+            self._rule_block_digests.get(standards_text) or text_digest(standards_text),
+            self.model_name,
+            self._tag_prompt_digests.get(tag),
         )
-        agent = self.tag_agents[tag]
+
+    async def _review_tag_prioritized(
+        self,
+        file_diff: FileDiff,
+        tag: Tag,
+        *,
+        language: Optional[str],
+        standards_text: str,
+        payload_json: str,
+    ) -> TagCRResult:
+        if self._budget_level() == "exhausted":
+            return self._budget_skipped_tag_result(file_diff, tag)
+        user_message = TAG_REVIEW_USER_TEMPLATE.format(payload_json=payload_json)
+        agent = self._get_tag_agent(tag, language, standards_text)
         try:
-            agent_state = await agent.ainvoke({"messages": [{"role": "user", "content": user_message}]})
+            agent_state = await self._invoke_tag_agent(agent, user_message)
             structured = agent_state.get("structured_response")
             if structured is None:
                 raise ValueError(f"Tag agent for {tag} 未返回结构化结果")
         except ValidationError:
-            structured = await self._review_tag_lenient(tag, user_message, reason="validation_error")
+            structured = await self._review_tag_lenient(
+                tag, language, standards_text, user_message, reason="validation_error"
+            )
         except ValueError:
-            structured = await self._review_tag_lenient(tag, user_message, reason="missing_structured_response")
+            structured = await self._review_tag_lenient(
+                tag, language, standards_text, user_message, reason="missing_structured_response"
+            )
+        except LLMThrottledError:
+            # 限流时不再发起兜底调用，避免进一步加重过载
+            structured = self._default_tag_llm_result("llm_throttled", needs_human_review=True)
+        except CircuitOpenError:
+            structured = self._default_tag_llm_result("llm_circuit_open", needs_human_review=True)
+        except BudgetExceededError:
+            return self._budget_skipped_tag_result(file_diff, tag)
         except Exception as exc:
-            structured = await self._review_tag_no_tools(tag, user_message, reason=type(exc).__name__)
+            structured = await self._review_tag_no_tools(
+                tag, language, standards_text, user_message, reason=type(exc).__name__
+            )
+        return self._tag_result(file_diff, tag, structured)
+
+    def _detect(self, file_diff: FileDiff, tags: List[Tag]) -> Tuple[List[Tag], dict[str, List[CRIssue]]]:
+        """Run the rule detectors once per file and assign each hit to one tag.
+
+        A hit goes to the first of its rule's domains among the file's tags; if none
+        was tagged, the rule's first enabled domain is added to the tags.
+        """
+        if not self.detectors:
+            return tags, {}
+        tags = list(tags)
+        issues: dict[str, List[CRIssue]] = {}
+        file_path = self._file_path(file_diff)
+        for hit in self.detectors.scan(file_diff, language=self._infer_language(file_diff)):
+            domains = [d for d in hit.rule.domains if d in self.enabled_tags]
+            if not domains:
+                continue
+            tag = next((d for d in domains if d in tags), domains[0])
+            if tag not in tags:
+                tags.append(tag)  # type: ignore[arg-type]
+            issues.setdefault(tag, []).append(RuleDetectors.to_issue(hit, file_path=file_path, tag=tag))
+        return tags, issues
+
+    def _detector_tag_result(self, file_diff: FileDiff, tag: Tag, issues: List[CRIssue]) -> TagCRResult:
+        summary = f"本地规则检出 {len(issues)} 个问题。" if issues else "本地规则检查未发现问题。"
+        structured = TagCRLLMResult(
+            summary=summary,
+            overall_severity=self._max_severity(issue.severity for issue in issues),  # type: ignore[arg-type]
+            approved=not any(self._severity_rank(issue.severity) >= 2 for issue in issues),
+            issues=issues,
+            meta={"detector_only": True},
+        )
+        return self._tag_result(file_diff, tag, structured)
+
+    def _with_detector_issues(self, result: TagCRResult, issues: Optional[List[CRIssue]]) -> TagCRResult:
+        # LLM 已就同一规则、同一 hunk 报告过的问题不再重复添加
+        reported = {(rid, issue.hunk_id) for issue in result.issues for rid in issue.rule_ids}
+        extra = [issue for issue in issues or [] if (issue.rule_ids[0], issue.hunk_id) not in reported]
+        if not extra:
+            return result
+        all_issues = [*result.issues, *extra]
+        return result.model_copy(
+            update={
+                "summary": f"{result.summary}（本地规则另检出 {len(extra)} 个问题）",
+                "overall_severity": self._max_severity([result.overall_severity, *(i.severity for i in extra)]),
+                "approved": result.approved and not any(self._severity_rank(i.severity) >= 2 for i in extra),
+                "issues": all_issues,
+                "rule_ids": sorted({rid for issue in all_issues for rid in issue.rule_ids if rid}),
+            }
+        )
+
+    async def _review_tag_chunked(
+        self,
+        file_diff: FileDiff,
+        tag: Tag,
+        *,
+        language: Optional[str],
+        standards_text: str,
+        chunks: List[List[int]],
+    ) -> TagCRResult:
+        """Review each hunk-aligned chunk of a large file in parallel and merge into one tag result."""
+        total = len(chunks)
+        results = await asyncio.gather(
+            *(
+                self._review_tag_prioritized(
+                    file_diff,
+                    tag,
+                    language=language,
+                    standards_text=standards_text,
+                    payload_json=json.dumps(
+                        self._prepare_payload(file_diff, chunk, chunk=(index, total)), ensure_ascii=False
+                    ),
+                )
+                for index, chunk in enumerate(chunks, start=1)
+            )
+        )
+        self.chunked_calls += total
+        issues: List[CRIssue] = []
+        summaries: List[str] = []
+        for chunk, result in zip(chunks, results):
+            issues.extend(self._remap_chunk_issue(issue, chunk) for issue in result.issues)
+            if result.summary not in summaries:
+                summaries.append(result.summary)
+        meta: dict = {"chunks": total}
+        fallback = next((r.meta["fallback_reason"] for r in results if r.meta.get("fallback_reason")), None)
+        if fallback:
+            meta["fallback_reason"] = fallback
+        return TagCRResult(
+            file_path=self._file_path(file_diff),
+            tag=tag,
+            summary=f"（分 {total} 段审查）" + "；".join(summaries),
+            overall_severity=self._max_severity(r.overall_severity for r in results),  # type: ignore[arg-type]
+            approved=all(r.approved for r in results),
+            issues=issues,
+            needs_human_review=any(r.needs_human_review for r in results),
+            rule_ids=sorted({rid for issue in issues for rid in issue.rule_ids if rid}),
+            meta=meta,
+        )
+
+    @staticmethod
+    def _remap_chunk_issue(issue: CRIssue, chunk: List[int]) -> CRIssue:
+        # 模型应沿用原 hunk_id；若给出的是段内序号（不在本段内），按段内位置换回原编号
+        hunk_ids = [idx + 1 for idx in chunk]
+        if issue.hunk_id is None or issue.hunk_id in hunk_ids:
+            return issue
+        if issue.hunk_id <= len(hunk_ids):
+            return issue.model_copy(update={"hunk_id": hunk_ids[issue.hunk_id - 1]})
+        return issue.model_copy(update={"hunk_id": None})
+
+    def _tag_result(self, file_diff: FileDiff, tag: Tag, structured: TagCRLLMResult) -> TagCRResult:
         rule_ids = sorted(
             {
                 rid
@@ -400,28 +1072,179 @@ class FileReviewEngine:
             meta=structured.meta,
         )
 
-    async def _review_tag_lenient(self, tag: Tag, user_message: str, *, reason: str) -> TagCRLLMResult:
-        agent = self._get_tag_agent_lenient(tag)
+    async def _review_tags_fused(
+        self,
+        file_diff: FileDiff,
+        tags: List[Tag],
+        *,
+        context_lines: Optional[int] = None,
+        payload_json: Optional[str] = None,
+    ) -> List[TagCRResult]:
+        """One structured call reviews all ``tags`` of a small file; tags missing from the answer fall back to per-tag review."""
+        language = self._infer_language(file_diff)
+        system_prompt = self._build_fused_system_prompt(tuple(tags), language)
+        key = self._fused_cache_key(
+            file_diff, tags, language=language, context_lines=context_lines, system_prompt=system_prompt
+        )
+        if key is not None:
+            cached = self.review_cache.get_json(key)  # type: ignore[union-attr]
+            if isinstance(cached, list):
+                try:
+                    return [TagCRResult.model_validate(item) for item in cached]
+                except ValidationError:
+                    pass
+
+        payload_json = payload_json or self._payload_json(file_diff)
+        results: dict[Tag, TagCRResult] = {}
+        if self._budget_level() == "exhausted":
+            return [self._budget_skipped_tag_result(file_diff, tag) for tag in tags]
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=FUSED_REVIEW_USER_TEMPLATE.format(payload_json=payload_json)),
+        ]
+        self.fused_calls += 1
+        try:
+            with llm_priority(min(self._priority_for(tag) for tag in tags)):
+                fused = await self.cached_llm.with_structured_output(FusedTagCRLLMResult).ainvoke(messages)
+            for section in fused.sections:
+                if section.tag in tags and section.tag not in results:
+                    results[section.tag] = self._tag_result(
+                        file_diff, section.tag, TagCRLLMResult.model_validate(section.model_dump(exclude={"tag"}))
+                    )
+        except LLMThrottledError:
+            return [self._default_tag_result(file_diff, tag, "llm_throttled") for tag in tags]
+        except CircuitOpenError:
+            return [self._default_tag_result(file_diff, tag, "llm_circuit_open") for tag in tags]
+        except BudgetExceededError:
+            return [self._budget_skipped_tag_result(file_diff, tag) for tag in tags]
+        except Exception:
+            results = {}
+
+        self.fused_tags += len(results)
+        missing = [tag for tag in tags if tag not in results]
+        if missing:
+            self.fused_fallbacks += 1
+            fallback = await asyncio.gather(
+                *(
+                    self._review_tag(file_diff, tag, context_lines=context_lines, payload_json=payload_json)
+                    for tag in missing
+                )
+            )
+            results.update(zip(missing, fallback))
+        ordered = [results[tag] for tag in tags]
+        if key is not None and not missing:
+            self.review_cache.set_json(key, [r.model_dump(mode="json") for r in ordered])  # type: ignore[union-attr]
+        return ordered
+
+    def _fused_cache_key(
+        self,
+        file_diff: FileDiff,
+        tags: List[Tag],
+        *,
+        language: Optional[str],
+        context_lines: Optional[int],
+        system_prompt: str,
+    ) -> Optional[str]:
+        if self.review_cache is None or not (file_diff.a_blob_sha or file_diff.b_blob_sha):
+            return None
+        return cache_key(
+            "fused_review",
+            file_diff.a_blob_sha,
+            file_diff.b_blob_sha,
+            context_lines,
+            self._file_path(file_diff),
+            self.max_patch_chars,
+            list(tags),
+            text_digest(system_prompt + FUSED_REVIEW_USER_TEMPLATE),
+            [self._rule_block_digests.get(self._rules_block(tag, language)) for tag in tags],
+            self.model_name,
+        )
+
+    def _build_fused_system_prompt(self, tags: Tuple[Tag, ...], language: Optional[str]) -> str:
+        """Shared instructions plus each tag's description and standards; memoized per (tags, language)."""
+        key = (tags, language)
+        prompt = self._fused_prompts.get(key)
+        if prompt is not None:
+            return prompt
+        sections = "\n".join(
+            f"### [{tag}]：{TAG_DESCRIPTIONS[tag]}\n"
+            f"适用代码规范（language={language or 'unknown'}, domain={tag}）：\n{self._rules_block(tag, language)}\n"
+            for tag in tags
+        )
+        prompt = (
+            "你是一名资深代码审查专家，需要在一次审查中分别完成以下多个专项领域的代码审查。"
+            "这是一个改动很小的文件，请对每个领域独立判断，**高检出率（Recall 优先）**地发现违反团队既有规范的改动。\n"
+            "\n"
+            "关键原则（务必遵守）：\n"
+            "1) 每个领域只报告与该领域相关的问题，同一问题不要在多个领域重复输出。\n"
+            "2) 以规范为准：每条 issue 必须能对应到该领域 standards 中的某条规则，并在 rule_ids 中列出；"
+            "找不到对应规则时默认不输出，除非是高风险或工程领域普遍共识的硬性问题（此时 rule_ids 输出 []，并在 message 中标注 \"advisory\"）。\n"
+            "3) 证据驱动：每条 issue 必须包含可定位的证据（具体代码片段/函数名/变更段），并给出所属 hunk 在输入中的 hunk_id 字段（整数，从 1 开始）。\n"
+            "4) 不要编造规则或臆测需求；禁止输出行号，不要使用 line_start/line_end 字段。\n"
+            "\n"
+            "审查领域与适用规范：\n"
+            f"{sections}"
+            "\n"
+            "输出要求（必须严格满足）：\n"
+            "- 只输出一次，且必须符合 FusedTagCRLLMResult 结构化模式。\n"
+            f"- sections 中为每个领域（{', '.join(tags)}）各输出一项，字段：tag、summary、overall_severity、approved、issues、needs_human_review、meta。\n"
+            "- 某领域未发现问题时，也必须输出该 section：summary 说明未发现问题、overall_severity=info、approved=true、issues=[]、needs_human_review=false、meta={}。\n"
+            "- issue 字段：category、message、rule_ids、severity、suggestion（可选）、hunk_id、confidence（可选）。\n"
+            "- 所有文字使用中文。\n"
+        )
+        self._fused_prompts[key] = prompt
+        return prompt
+
+    def _default_tag_result(self, file_diff: FileDiff, tag: Tag, reason: str) -> TagCRResult:
+        return self._tag_result(file_diff, tag, self._default_tag_llm_result(reason, needs_human_review=True))
+
+    async def _invoke_tag_agent(self, agent: ReactDomainAgent, user_message: str) -> dict:
+        def call():
+            return agent.ainvoke({"messages": [{"role": "user", "content": user_message}]})
+
+        if self.hedge_policy is None:
+            return await call()
+        return await self.hedge_policy.run(call)
+
+    async def _review_tag_lenient(
+        self,
+        tag: Tag,
+        language: Optional[str],
+        standards_text: str,
+        user_message: str,
+        *,
+        reason: str,
+    ) -> TagCRLLMResult:
+        agent = self._get_tag_agent_lenient(tag, language, standards_text)
         try:
             agent_state = await agent.ainvoke({"messages": [{"role": "user", "content": user_message}]})
             structured = agent_state.get("structured_response")
             if structured is None:
                 raise ValueError("Tag agent lenient 未返回结构化结果")
             return structured.to_strict()
+        except CircuitOpenError:
+            return self._default_tag_llm_result("llm_circuit_open", needs_human_review=True)
         except Exception:
             return self._default_tag_llm_result(f"lenient_failed:{reason}")
 
-    async def _review_tag_no_tools(self, tag: Tag, user_message: str, *, reason: str) -> TagCRLLMResult:
-        prompt = self._build_tag_agent_prompt_no_tools(tag)
-        llm_for_chain = self.llm._llm if isinstance(self.llm, RateLimitedLLM) else self.llm
-        chain = ChatPromptTemplate.from_messages(
-            [
-                ("system", prompt),
-                ("human", "{input}"),
-            ]
-        ) | llm_for_chain
+    async def _review_tag_no_tools(
+        self,
+        tag: Tag,
+        language: Optional[str],
+        standards_text: str,
+        user_message: str,
+        *,
+        reason: str,
+    ) -> TagCRLLMResult:
+        # 直接构造消息而不是走 ChatPromptTemplate：提示词与规范中的花括号不能被当作模板变量
+        messages = [
+            SystemMessage(content=self._build_tag_agent_prompt_no_tools(tag, language, standards_text)),
+            HumanMessage(content=user_message),
+        ]
         try:
-            response = await chain.ainvoke({"input": user_message})
+            response = await self.cached_llm.ainvoke(messages)
+        except CircuitOpenError:
+            return self._default_tag_llm_result("llm_circuit_open", needs_human_review=True)
         except Exception:
             return self._default_tag_llm_result(f"no_tools_failed:{reason}")
 
@@ -436,8 +1259,8 @@ class FileReviewEngine:
         except Exception:
             return self._default_tag_llm_result(f"no_tools_to_strict_failed:{reason}")
 
-    def _build_tag_agent_prompt_no_tools(self, tag: Tag) -> str:
-        base = self._build_tag_agent_prompt(tag)
+    def _build_tag_agent_prompt_no_tools(self, tag: Tag, language: Optional[str], standards_text: str) -> str:
+        base = self._build_tag_system_prompt(tag, language, standards_text)
         return f"{base}\n\n注意：当前运行环境无法正确使用工具调用，请勿调用任何工具，直接基于 standards 输出结构化结果。"
 
     @staticmethod
@@ -468,7 +1291,16 @@ class FileReviewEngine:
         return text[start : end + 1]
 
     @staticmethod
-    def _default_tag_llm_result(reason: str) -> TagCRLLMResult:
+    def _default_tag_llm_result(reason: str, *, needs_human_review: bool = False) -> TagCRLLMResult:
+        if needs_human_review:
+            return TagCRLLMResult(
+                summary="未能完成该标签的自动审查，请人工确认。",
+                overall_severity="info",
+                approved=False,
+                issues=[],
+                needs_human_review=True,
+                meta={"fallback_reason": reason},
+            )
         return TagCRLLMResult(
             summary="未发现需要专项审查的问题。",
             overall_severity="info",
@@ -533,17 +1365,24 @@ class FileReviewEngine:
     # 工具方法
     # ------------------------------------------------------------------ #
 
+    @staticmethod
+    def _model_name(llm) -> str:
+        params = getattr(llm, "_identifying_params", None) or {}
+        return str(params.get("model_name") or params.get("model") or type(llm).__name__)
+
     @staticmethod
     def _file_path(file_diff: FileDiff) -> str:
         return file_diff.b_path or file_diff.a_path or "<unknown>"
 
-    def _serialize_hunks(self, file_diff: FileDiff) -> List[dict]:
+    def _serialize_hunks(self, file_diff: FileDiff, hunk_indices: Optional[List[int]] = None) -> List[dict]:
         if not file_diff.hunks:
             return []
         max_chars = self.max_patch_chars
         total = 0
         payload: List[dict] = []
-        for idx, hunk in enumerate(file_diff.hunks, start=1):
+        indices = range(len(file_diff.hunks)) if hunk_indices is None else hunk_indices
+        for idx in indices:
+            hunk = file_diff.hunks[idx]
             remaining = max_chars - total
             if remaining <= 0:
                 break
@@ -554,7 +1393,7 @@ class FileReviewEngine:
                 truncated = True
             payload.append(
                 {
-                    "hunk_id": idx,
+                    "hunk_id": idx + 1,
                     "header": hunk.header,
                     "old_start": hunk.old_start,
                     "old_lines": hunk.old_lines,
@@ -590,6 +1429,9 @@ class FileReviewEngine:
     def _filter_enabled_tags(self, tags: Iterable[Tag]) -> List[Tag]:
         return [tag for tag in tags if tag in self.enabled_tags]
 
+    def _priority_for(self, call_type: str) -> int:
+        return self.priorities.get(call_type, DEFAULT_PRIORITY)
+
     def _tools_for_tag(self, tag: Tag) -> List:
         """Return tools for a tag, always including code_standard_doc."""
         base = list(TAG_TOOLS.get(tag, []))
@@ -660,6 +1502,43 @@ class FileReviewEngine:
                 best = str(sev)
         return best
 
+    def _budget_level(self) -> str:
+        return self.budget.level() if self.budget is not None else "ok"
+
+    def _budget_dropped_tags(self, tags: Iterable[Tag]) -> List[Tag]:
+        level = self._budget_level()
+        if level == "exhausted":
+            return list(tags)
+        if level == "essential_tags":
+            return [tag for tag in tags if self._priority_for(tag) >= LOW_PRIORITY_TAG_CUTOFF]
+        return []
+
+    def _budget_skip_file(self, file_diff: FileDiff) -> dict:
+        if self.budget is not None:
+            self.budget.note_skip("files", self._file_path(file_diff))
+        return {
+            "tags": [],
+            "file_cr_result": self._skip_file_result(
+                file_diff,
+                reason="budget_exhausted",
+                summary="本次运行的 LLM 预算已耗尽，跳过自动审查，请人工确认。",
+            ),
+        }
+
+    def _budget_skipped_tag_result(self, file_diff: FileDiff, tag: Tag) -> TagCRResult:
+        if self.budget is not None:
+            self.budget.note_skip("tags", f"{self._file_path(file_diff)}:{tag}")
+        return TagCRResult(
+            file_path=self._file_path(file_diff),
+            tag=tag,
+            summary="LLM 预算不足，跳过该标签的自动审查，请人工确认。",
+            overall_severity="info",
+            approved=False,
+            issues=[],
+            needs_human_review=True,
+            meta={"fallback_reason": "budget_skipped"},
+        )
+
     def _skip_file_result(self, file_diff: FileDiff, *, reason: str, summary: str) -> FileCRResult:
         return FileCRResult(
             file_path=self._file_path(file_diff),
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Set, TypeVar
+
+from cr_agent.single_flight import bypass_single_flight
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(max(0.0, seconds))
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[idx]
+
+
+class HedgePolicy:
+    """对慢调用发起对冲请求：超过本次运行中学到的延迟分位数仍未返回时，再发一份相同请求，取先完成者。
+
+    对冲请求与原请求走同一个 llm 包装（RateLimitedLLM / LLMPool），因此同样占用限速额度；
+    另外对冲次数不超过已完成调用数的 ``max_hedge_ratio``，避免在整体变慢时翻倍放大负载。
+    样本数不足 ``min_samples`` 时不对冲。
+
+    延迟样本只取原请求的完整耗时：对冲请求胜出时原请求不取消，完成后再记录，
+    否则样本会偏向更快的一方，阈值逐步降低、对冲越来越频繁。
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.95,
+        min_samples: int = 5,
+        max_hedge_ratio: float = 0.1,
+        min_delay: float = 1.0,
+        window: int = 200,
+    ):
+        self.percentile = min(max(percentile, 0.5), 0.999)
+        self.min_samples = max(1, min_samples)
+        self.max_hedge_ratio = max(0.0, max_hedge_ratio)
+        self.min_delay = max(0.0, min_delay)
+        self.latencies = LatencyTracker(window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # 对冲胜出后仍在运行、等待记录延迟的原请求；保留引用避免被回收
+        self._stragglers: Set[asyncio.Future] = set()
+
+    def hedge_delay(self) -> Optional[float]:
+        if len(self.latencies) < self.min_samples:
+            return None
+        if self.hedges + 1 > self.max_hedge_ratio * max(self.calls, 1):
+            return None
+        threshold = self.latencies.percentile(self.percentile)
+        return None if threshold is None else max(self.min_delay, threshold)
+
+    async def run(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """Run ``factory()``; if it is slower than the learned threshold, race it against a duplicate."""
+        self.calls += 1
+        start = time.monotonic()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(factory())
+        tasks = [primary]
+        winner: Optional[asyncio.Future] = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    # 对冲请求与原请求完全相同，必须绕过 single-flight，否则会直接并入原请求
+                    with bypass_single_flight():
+                        tasks.append(asyncio.ensure_future(factory()))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                if task.done():
+                    continue
+                if task is primary and winner is not None and winner.exception() is None:
+                    self._record_when_done(primary, start)
+                else:
+                    task.cancel()
+        if winner is not primary and winner.exception() is None:
+            self.hedge_wins += 1
+        if primary.done() and not primary.cancelled():
+            self.latencies.record(time.monotonic() - start)
+        return winner.result()
+
+    def _record_when_done(self, primary: asyncio.Future, start: float) -> None:
+        def _done(task: asyncio.Future) -> None:
+            self._stragglers.discard(task)
+            if not task.cancelled():
+                task.exception()  # 标记异常已读取
+                self.latencies.record(time.monotonic() - start)
+
+        self._stragglers.add(primary)
+        primary.add_done_callback(_done)
+
+    @staticmethod
+    async def _first_success(tasks: list[asyncio.Future]) -> asyncio.Future:
+        pending = set(tasks)
+        first_failed: Optional[asyncio.Future] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is None:
+                    return task
+                first_failed = first_failed or task
+        assert first_failed is not None
+        return first_failed
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+
+__all__ = ["HedgePolicy", "LatencyTracker"]
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from pydantic import ValidationError
+
+from cr_agent.cache import SQLiteCache, cache_key, text_digest
+from cr_agent.file_review import FileReviewEngine
+from cr_agent.models import CRIssue, FileCRResult, FileDiff, FileHunk
+
+_SEVERITY_ORDER = ("info", "minor", "major", "critical")
+
+
+def _normalized_body(hunk: FileHunk) -> str:
+    # 去掉 @@ 行号头与行尾空白：仅行号偏移或换行符不同的 hunk 视为相同
+    lines = hunk.text.splitlines()
+    if lines and lines[0].startswith("@@"):
+        lines = lines[1:]
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def hunk_fingerprint(hunk: FileHunk) -> str:
+    """Digest of the hunk body without its ``@@`` header, so pure line shifts keep the same fingerprint."""
+    return text_digest(_normalized_body(hunk))
+
+
+def patch_fingerprint(file_diff: FileDiff) -> Optional[str]:
+    """Per-file analogue of ``git patch-id``: all normalized hunk bodies in order, independent of blobs and line numbers."""
+    if not file_diff.hunks:
+        return None
+    return text_digest("\n@@\n".join(_normalized_body(hunk) for hunk in file_diff.hunks))
+
+
+class IncrementalReviewer:
+    """增量审查：与之前审查过的提交对比 hunk 指纹，未变的 hunk 直接复用已存的问题，只把新增/修改的 hunk 交给标签 agent。
+
+    每次审查（无论是否增量）都把文件的 hunk 指纹与问题按 (commit, 文件路径) 写入 ``store``，
+    供之后以该提交为基线的运行复用；同时按 (patch 指纹, 文件路径) 保存整个文件结果，
+    cherry-pick、rebase、backport 产生的相同补丁即使 blob 不同也能直接复用。降级/兜底产生的结果不写入。
+    """
+
+    def __init__(self, engine: FileReviewEngine, store: SQLiteCache, *, since_sha: Optional[str] = None):
+        self.engine = engine
+        self.store = store
+        self.since_sha = since_sha
+        self.files_reused = 0
+        self.files_partial = 0
+        self.hunks_reused = 0
+        self.hunks_reviewed = 0
+        self.files_patch_reused = 0
+
+    async def review_file(
+        self,
+        file_diff: FileDiff,
+        *,
+        commit_sha: Optional[str],
+        context_lines: Optional[int] = None,
+    ) -> FileCRResult:
+        path = self._file_path(file_diff)
+        patch_id = patch_fingerprint(file_diff)
+        fingerprints = [hunk_fingerprint(hunk) for hunk in file_diff.hunks]
+        reused_patch = self._load_patch_result(patch_id, path, context_lines) if patch_id else None
+        if reused_patch is not None:
+            self.files_patch_reused += 1
+            self.hunks_reused += len(fingerprints)
+            result = self._reuse_patch(file_diff, reused_patch, patch_id)  # type: ignore[arg-type]
+            if commit_sha:
+                self._save(commit_sha, path, context_lines, file_diff, fingerprints, result)
+            return result
+
+        previous = self._load(self.since_sha, path, context_lines) if self.since_sha else None
+        prev_hunks: Dict[str, List[dict]] = (previous or {}).get("hunks") or {}
+        fresh = [idx for idx, fp in enumerate(fingerprints) if fp not in prev_hunks]
+
+        if previous is None or not fingerprints or len(fresh) == len(fingerprints):
+            result = await self.engine.review_file(file_diff, context_lines=context_lines)
+            self.hunks_reviewed += len(fingerprints)
+        else:
+            reused = self._reused_issues(previous, fingerprints, prev_hunks)
+            if fresh:
+                partial = self._partial_diff(file_diff, fresh)
+                partial_result = await self.engine.review_file(partial, context_lines=context_lines)
+                result = self._merge(file_diff, partial_result, fresh, reused, previous)
+                self.files_partial += 1
+            else:
+                result = self._reuse_all(file_diff, reused, previous)
+                self.files_reused += 1
+            self.hunks_reused += len(fingerprints) - len(fresh)
+            self.hunks_reviewed += len(fresh)
+
+        if not self._degraded(result):
+            if commit_sha:
+                self._save(commit_sha, path, context_lines, file_diff, fingerprints, result)
+            if patch_id:
+                self.store.set_json(self._patch_key(patch_id, path, context_lines), result.model_dump(mode="json"))
+        return result
+
+    def diff_to_review(self, file_diff: FileDiff, *, context_lines: Optional[int] = None) -> Optional[FileDiff]:
+        """The FileDiff review_file will hand to the engine: None when stored results cover the whole file,
+        the partial diff of fresh hunks, or the file itself."""
+        path = self._file_path(file_diff)
+        patch_id = patch_fingerprint(file_diff)
+        if patch_id and self.store.get_json(self._patch_key(patch_id, path, context_lines)) is not None:
+            return None
+        if not self.since_sha or not file_diff.hunks:
+            return file_diff
+        previous = self._load(self.since_sha, path, context_lines)
+        if previous is None:
+            return file_diff
+        prev_hunks = previous.get("hunks") or {}
+        fresh = [idx for idx, hunk in enumerate(file_diff.hunks) if hunk_fingerprint(hunk) not in prev_hunks]
+        if not fresh:
+            return None
+        if len(fresh) == len(file_diff.hunks):
+            return file_diff
+        return self._partial_diff(file_diff, fresh)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "files_reused": self.files_reused,
+            "files_partial": self.files_partial,
+            "hunks_reused": self.hunks_reused,
+            "hunks_reviewed": self.hunks_reviewed,
+            "files_patch_reused": self.files_patch_reused,
+        }
+
+    # ------------------------------------------------------------------ #
+    # 存取
+    # ------------------------------------------------------------------ #
+
+    def _record_key(self, commit_sha: str, path: str, context_lines: Optional[int]) -> str:
+        return cache_key("incremental_file", commit_sha, path, context_lines, self.engine.review_config_digest)
+
+    def _patch_key(self, patch_id: str, path: str, context_lines: Optional[int]) -> str:
+        # 路径参与 key：语言推断、黑名单都依赖路径，同一补丁落在不同文件上不能直接复用
+        return cache_key("patch_file", patch_id, path, context_lines, self.engine.review_config_digest)
+
+    def _load_patch_result(self, patch_id: str, path: str, context_lines: Optional[int]) -> Optional[FileCRResult]:
+        data = self.store.get_json(self._patch_key(patch_id, path, context_lines))
+        if not isinstance(data, dict):
+            return None
+        try:
+            return FileCRResult.model_validate(data)
+        except ValidationError:
+            return None
+
+    def _load(self, commit_sha: str, path: str, context_lines: Optional[int]) -> Optional[dict]:
+        record = self.store.get_json(self._record_key(commit_sha, path, context_lines))
+        if not isinstance(record, dict) or "result" not in record:
+            return None
+        return record
+
+    def _save(
+        self,
+        commit_sha: str,
+        path: str,
+        context_lines: Optional[int],
+        file_diff: FileDiff,
+        fingerprints: List[str],
+        result: FileCRResult,
+    ) -> None:
+        # 因 max_patch_chars / 分段上限截断而未完整审查的 hunk 不记录，下次仍需审查
+        reviewed = self.engine.reviewed_hunk_ids(file_diff)
+        hunks: Dict[str, List[dict]] = {fp: [] for idx, fp in enumerate(fingerprints, start=1) if idx in reviewed}
+        file_issues: List[dict] = []
+        for issue in result.issues:
+            data = issue.model_dump(mode="json")
+            if issue.hunk_id is not None and issue.hunk_id <= len(fingerprints):
+                fp = fingerprints[issue.hunk_id - 1]
+                if fp in hunks:
+                    hunks[fp].append(data)
+            else:
+                file_issues.append(data)
+        record = {
+            "hunks": hunks,
+            "file_issues": file_issues,
+            "result": result.model_dump(mode="json", exclude={"issues"}),
+        }
+        self.store.set_json(self._record_key(commit_sha, path, context_lines), record)
+
+    # ------------------------------------------------------------------ #
+    # 合并
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _reused_issues(previous: dict, fingerprints: List[str], prev_hunks: Dict[str, List[dict]]) -> List[CRIssue]:
+        issues = [CRIssue.model_validate(data) for data in previous.get("file_issues") or []]
+        for idx, fp in enumerate(fingerprints, start=1):
+            for data in prev_hunks.get(fp) or []:
+                issues.append(CRIssue.model_validate({**data, "hunk_id": idx}))
+        return issues
+
+    @staticmethod
+    def _partial_diff(file_diff: FileDiff, fresh: List[int]) -> FileDiff:
+        hunks = [file_diff.hunks[idx] for idx in fresh]
+        added = deleted = 0
+        for hunk in hunks:
+            for line in hunk.text.splitlines()[1:]:
+                if line.startswith("+"):
+                    added += 1
+                elif line.startswith("-"):
+                    deleted += 1
+        # 不带 blob SHA：局部 diff 不能命中或污染整文件的审查缓存
+        return replace(
+            file_diff,
+            hunks=hunks,
+            patch="".join(hunk.text for hunk in hunks),
+            added_lines=added,
+            deleted_lines=deleted,
+            a_blob_sha=None,
+            b_blob_sha=None,
+        )
+
+    def _merge(
+        self,
+        file_diff: FileDiff,
+        partial: FileCRResult,
+        fresh: List[int],
+        reused: List[CRIssue],
+        previous: dict,
+    ) -> FileCRResult:
+        new_issues = [
+            issue.model_copy(update={"hunk_id": fresh[issue.hunk_id - 1] + 1})
+            if issue.hunk_id is not None and issue.hunk_id <= len(fresh)
+            else issue
+            for issue in partial.issues
+        ]
+        issues = reused + new_issues
+        prev_result = previous["result"]
+        approved = partial.approved and (not reused or bool(prev_result.get("approved")))
+        reused_count = len(file_diff.hunks) - len(fresh)
+        return FileCRResult(
+            file_path=partial.file_path,
+            change_type=file_diff.change_type,
+            summary=f"{partial.summary}（增量审查：复用 {reused_count} 个未变更 hunk 的结论，重新审查 {len(fresh)} 个）",
+            overall_severity=self._max_severity([partial.overall_severity, *(i.severity for i in reused)]),  # type: ignore[arg-type]
+            approved=approved,
+            issues=issues,
+            rule_ids=sorted({rid for issue in issues for rid in issue.rule_ids if rid}),
+            needs_human_review=partial.needs_human_review,
+            meta={**partial.meta, "incremental": self._meta(reused_count, len(fresh), base_summary=partial.summary)},
+        )
+
+    @staticmethod
+    def _reuse_patch(file_diff: FileDiff, previous: FileCRResult, patch_id: str) -> FileCRResult:
+        # 补丁指纹相同意味着 hunk 顺序一致，hunk_id 原样对应到新 diff；只需换成本次的路径与变更类型
+        path = IncrementalReviewer._file_path(file_diff)
+        issues = [
+            issue.model_copy(update={"file_path": path}) if issue.file_path else issue for issue in previous.issues
+        ]
+        return previous.model_copy(
+            update={
+                "file_path": path,
+                "change_type": file_diff.change_type,
+                "issues": issues,
+                "meta": {**previous.meta, "patch_reuse": {"patch_id": patch_id}},
+            }
+        )
+
+    def _reuse_all(self, file_diff: FileDiff, reused: List[CRIssue], previous: dict) -> FileCRResult:
+        prev_result = dict(previous["result"])
+        prev_meta = prev_result.get("meta") or {}
+        base_summary = (prev_meta.get("incremental") or {}).get("base_summary") or prev_result.get("summary")
+        prev_result.update(
+            change_type=file_diff.change_type,
+            summary=f"{base_summary}（增量审查：所有 hunk 与基线一致，直接复用结论）",
+            issues=[issue.model_dump(mode="json") for issue in reused],
+            rule_ids=sorted({rid for issue in reused for rid in issue.rule_ids if rid}),
+            meta={**prev_meta, "incremental": self._meta(len(file_diff.hunks), 0, base_summary=base_summary)},
+        )
+        return FileCRResult.model_validate(prev_result)
+
+    def _meta(self, reused: int, reviewed: int, *, base_summary: str) -> dict:
+        return {
+            "since": self.since_sha,
+            "reused_hunks": reused,
+            "reviewed_hunks": reviewed,
+            "base_summary": base_summary,
+        }
+
+    @staticmethod
+    def _degraded(result: FileCRResult) -> bool:
+        if result.meta.get("reason"):
+            return True
+        return any((tr.get("meta") or {}).get("fallback_reason") for tr in result.meta.get("per_tag") or [])
+
+    @staticmethod
+    def _max_severity(severities: List[str]) -> str:
+        return max(severities, key=lambda s: _SEVERITY_ORDER.index(s) if s in _SEVERITY_ORDER else 0, default="info")
+
+    @staticmethod
+    def _file_path(file_diff: FileDiff) -> str:
+        return file_diff.b_path or file_diff.a_path or "<unknown>"
+
+
+__all__ = ["IncrementalReviewer", "hunk_fingerprint", "patch_fingerprint"]
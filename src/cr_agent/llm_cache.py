@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Any, List, Literal, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from cr_agent.cache import SQLiteCache
+from cr_agent.rate_limiter import rebind_runnable
+from cr_agent.single_flight import request_key
+
+LLMCacheMode = Literal["on", "read-only", "refresh"]
+
+# 同一次运行内记住的请求 key 数量上限；重试总是紧跟首次请求，只需保留最近的 key
+_MAX_SEEN_KEYS = 4096
+
+
+def _dump_result(result: ChatResult) -> str:
+    return json.dumps(
+        {
+            "generations": [
+                {"message": message_to_dict(gen.message), "generation_info": gen.generation_info}
+                for gen in result.generations
+            ],
+            "llm_output": result.llm_output,
+        },
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def _load_result(raw: str) -> Optional[ChatResult]:
+    try:
+        data = json.loads(raw)
+        messages = messages_from_dict([gen["message"] for gen in data["generations"]])
+    except (KeyError, TypeError, ValueError):
+        return None
+    generations = [
+        ChatGeneration(message=message, generation_info=gen.get("generation_info"))
+        for message, gen in zip(messages, data["generations"])
+    ]
+    return ChatResult(generations=generations, llm_output=data.get("llm_output"))
+
+
+class CachedLLM(BaseChatModel):
+    """Chat model wrapper that serves identical requests from an on-disk SQLiteCache.
+
+    The key is the canonical request: model params (model name, temperature, ...),
+    messages, stop and bound tools / response schema.  ``mode`` selects
+    ``on`` (read + write), ``read-only`` (never write) or ``refresh`` (never read,
+    overwrite with fresh responses).  Only chains that are safe to replay use this
+    wrapper — the tagger chain, the no-tools fallback and ContextRefiner — not the
+    multi-step ReAct agents.
+
+    A key requested a second time within the same run is treated as the caller
+    retrying (e.g. ``with_retry`` after a structured-output parse failure): the
+    cache is bypassed and the fresh response overwrites the entry.  Only the most
+    recent keys are remembered, so long runs keep bounded memory.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseChatModel
+    response_cache: Any
+    mode: LLMCacheMode = "on"
+
+    _seen: OrderedDict[str, None] = PrivateAttr(default_factory=OrderedDict)
+
+    def __init__(self, llm: BaseChatModel, response_cache: SQLiteCache, *, mode: LLMCacheMode = "on", **kwargs: Any):
+        super().__init__(llm=llm, response_cache=response_cache, mode=mode, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return dict(self.llm._identifying_params)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = request_key(self._identifying_params, messages, stop, kwargs)
+        retry = key in self._seen
+        self._seen[key] = None
+        self._seen.move_to_end(key)
+        if len(self._seen) > _MAX_SEEN_KEYS:
+            self._seen.popitem(last=False)
+        if self.mode != "refresh" and not retry:
+            raw = self.response_cache.get(key)
+            cached = _load_result(raw) if raw is not None else None
+            if cached is not None:
+                return cached
+        result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if self.mode != "read-only":
+            self.response_cache.set(key, _dump_result(result))
+        return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop and loop.is_running():
+            raise RuntimeError("CachedLLM.invoke cannot run inside an existing event loop")
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return rebind_runnable(self.llm.bind_tools(tools, **kwargs), source=self.llm, target=self)
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        return rebind_runnable(self.llm.with_structured_output(schema, **kwargs), source=self.llm, target=self)
+
+
+__all__ = ["CachedLLM", "LLMCacheMode"]
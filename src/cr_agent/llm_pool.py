@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from cr_agent.circuit_breaker import is_transport_error
+from cr_agent.rate_limiter import LLMThrottledError, rebind_runnable
+
+# 可切换到其它端点重试的 HTTP 状态码；其余 4xx（参数错误、上下文超长等）换端点也不会成功
+FAILOVER_STATUS_CODES: tuple[int, ...] = (408, 409, 429)
+
+
+@dataclass
+class PoolEndpoint:
+    """One gateway/key in the pool; ``llm`` is usually a RateLimitedLLM with its own limiter."""
+
+    name: str
+    llm: BaseChatModel
+    weight: float = 1.0
+    inflight: int = 0
+    calls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def load(self) -> float:
+        return (self.inflight + 1) / max(self.weight, 1e-6)
+
+
+def is_failover_error(exc: BaseException) -> bool:
+    """Connection errors, timeouts, throttling and 5xx are worth retrying on another endpoint."""
+    if isinstance(exc, LLMThrottledError) or is_transport_error(exc):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if not isinstance(status, int):
+        return False  # 解析错误、参数错误等与端点健康无关，不应把端点摘除
+    return status in FAILOVER_STATUS_CODES or status >= 500
+
+
+class LLMPool(BaseChatModel):
+    """Chat model that routes each call to the least-loaded healthy endpoint and fails over on errors.
+
+    Load is in-flight calls divided by weight. A failing endpoint is taken out
+    of rotation with exponential cooldown; when every endpoint is cooling down
+    the one that recovers first is still tried rather than failing outright.
+    Like RateLimitedLLM, ``bind_tools``/``with_structured_output`` are rebound
+    onto the pool so every generation goes through routing.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    endpoints: List[PoolEndpoint]
+    base_cooldown: float = 5.0
+    max_cooldown: float = 60.0
+
+    _cursor: int = PrivateAttr(default=0)
+
+    def __init__(self, endpoints: Sequence[PoolEndpoint], **kwargs: Any):
+        if not endpoints:
+            raise ValueError("LLMPool 至少需要一个端点")
+        super().__init__(endpoints=list(endpoints), **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-pool"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        params = dict(self._prototype._identifying_params)
+        models: List[str] = []
+        for endpoint in self.endpoints:
+            endpoint_params = endpoint.llm._identifying_params
+            model = str(endpoint_params.get("model_name") or endpoint_params.get("model") or "")
+            if model not in models:
+                models.append(model)
+        if len(models) > 1:
+            # 端点模型不同：缓存与请求合并的 key 必须覆盖全部模型，不能把 A 的回答当作 B 的回放
+            params["model_name"] = "+".join(sorted(models))
+            params.pop("model", None)
+        return params
+
+    @property
+    def _prototype(self) -> BaseChatModel:
+        return self.endpoints[0].llm
+
+    def _pick(self, exclude: set[str]) -> Optional[PoolEndpoint]:
+        candidates = [ep for ep in self.endpoints if ep.name not in exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        healthy = [ep for ep in candidates if ep.is_healthy(now)]
+        if not healthy:
+            return min(candidates, key=lambda ep: ep.unhealthy_until)
+        # 负载相同时轮转起点，避免总是压在列表第一个端点上
+        self._cursor = (self._cursor + 1) % len(healthy)
+        rotated = healthy[self._cursor :] + healthy[: self._cursor]
+        return min(rotated, key=lambda ep: ep.load())
+
+    def _mark_failure(self, endpoint: PoolEndpoint) -> None:
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (endpoint.consecutive_failures - 1))
+        endpoint.unhealthy_until = time.monotonic() + cooldown
+
+    @staticmethod
+    def _mark_success(endpoint: PoolEndpoint) -> None:
+        endpoint.consecutive_failures = 0
+        endpoint.unhealthy_until = 0.0
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried: set[str] = set()
+        last_exc: Optional[BaseException] = None
+        while True:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.name)
+            endpoint.inflight += 1
+            endpoint.calls += 1
+            try:
+                result = await endpoint.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as exc:
+                if not is_failover_error(exc):
+                    raise
+                self._mark_failure(endpoint)
+                last_exc = exc
+                continue
+            finally:
+                endpoint.inflight -= 1
+            self._mark_success(endpoint)
+            return result
+        assert last_exc is not None
+        raise last_exc
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop and loop.is_running():
+            raise RuntimeError("LLMPool.invoke cannot run inside an existing event loop")
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return rebind_runnable(self._prototype.bind_tools(tools, **kwargs), source=self._prototype, target=self)
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        return rebind_runnable(
+            self._prototype.with_structured_output(schema, **kwargs),
+            source=self._prototype,
+            target=self,
+        )
+
+
+__all__ = ["LLMPool", "PoolEndpoint", "is_failover_error"]
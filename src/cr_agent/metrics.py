@@ -7,7 +7,7 @@ import uuid
 import urllib.request
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 from cr_agent.models import CommitDiff, FileCRResult
 
@@ -48,6 +48,8 @@ def build_metrics_payload(
     repo_path: str,
     commit_diff: CommitDiff | None,
     file_results: Iterable[FileCRResult],
+    llm_budget: Optional[Dict[str, object]] = None,
+    llm_usage: Optional[Dict[str, object]] = None,
 ) -> Dict[str, object]:
     repo_name = os.getenv("MODULE_NAME") or os.getenv("CR_REPO_NAME") or Path(repo_path).name
     code_change_id = os.getenv("CHANGE_URL") or "unknown"
@@ -58,7 +60,7 @@ def build_metrics_payload(
     diff_lines = _diff_lines_changed(commit_diff)
     triggered_total_hits, rule_hits = _rule_hit_counts(file_results)
 
-    return {
+    payload: Dict[str, object] = {
         "repo": repo_name,
         "code_change_id": code_change_id,
         "agent_run_id": agent_run_id,
@@ -69,6 +71,11 @@ def build_metrics_payload(
         "triggered_total_hits": triggered_total_hits,
         "rule_hits": rule_hits,
     }
+    if llm_budget is not None:
+        payload["llm_budget"] = llm_budget
+    if llm_usage is not None:
+        payload["llm_usage"] = llm_usage
+    return payload
 
 
 def send_metrics_report(payload: Dict[str, object], *, base_url: str, timeout: float = 5.0) -> None:
@@ -135,6 +135,18 @@ class FileTaggingLLMResult(BaseModel):
     reasoning: Optional[str] = None
 
 
+class BatchFileTaggingItem(FileTaggingLLMResult):
+    """Tags for one file of a batched tagging call."""
+
+    file_path: str
+
+
+class BatchFileTaggingLLMResult(BaseModel):
+    """LLM output for tagging several small files in one call, keyed by file_path."""
+
+    files: List[BatchFileTaggingItem] = Field(default_factory=list)
+
+
 class FileTaggingResult(BaseModel):
     """LLM-generated tags for a single file diff."""
 
@@ -193,6 +205,18 @@ class TagCRLLMResultFallback(BaseModel):
         )
 
 
+class FusedTagCRSection(TagCRLLMResult):
+    """One tag's section of a fused multi-tag review."""
+
+    tag: Tag
+
+
+class FusedTagCRLLMResult(BaseModel):
+    """LLM output for a fused review covering several tags of one small file in a single call."""
+
+    sections: List[FusedTagCRSection] = Field(default_factory=list)
+
+
 class TagCRResult(BaseModel):
     """Review result for one (file, tag) dimension."""
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cr_agent.models import FileDiff, Tag
+
+
+@dataclass(frozen=True)
+class PreTagRule:
+    """A local tagging heuristic: all given conditions must hold for the rule to fire.
+
+    ``paths`` are regexes over the file path (any may match), ``exclude_paths``
+    veto the rule; ``lines`` are regexes over the changed (added/removed) lines of
+    the hunks, without the +/- marker.
+    """
+
+    name: str
+    tags: Tuple[Tag, ...]
+    confidence: float
+    paths: Tuple[re.Pattern, ...] = tuple()
+    lines: Tuple[re.Pattern, ...] = tuple()
+    exclude_paths: Tuple[re.Pattern, ...] = tuple()
+
+    def matches(self, path: str, changed_lines: List[str]) -> bool:
+        if any(pattern.search(path) for pattern in self.exclude_paths):
+            return False
+        if self.paths and not any(pattern.search(path) for pattern in self.paths):
+            return False
+        if self.lines and not any(pattern.search(line) for pattern in self.lines for line in changed_lines):
+            return False
+        return bool(self.paths or self.lines)
+
+
+@dataclass(frozen=True)
+class PreTagDecision:
+    tags: Tuple[Tag, ...]
+    confidence: float
+    rules: Tuple[str, ...]
+    conclusive: bool
+
+    @property
+    def reasoning(self) -> str:
+        return f"本地规则判定（{', '.join(self.rules)}，置信度 {self.confidence:.2f}）"
+
+
+def _rule(name: str, tags: Iterable[str], confidence: float, *, paths=(), lines=(), exclude_paths=()) -> PreTagRule:
+    return PreTagRule(
+        name=name,
+        tags=tuple(tags),  # type: ignore[arg-type]
+        confidence=confidence,
+        paths=tuple(re.compile(p) for p in paths),
+        lines=tuple(re.compile(p) for p in lines),
+        exclude_paths=tuple(re.compile(p) for p in exclude_paths),
+    )
+
+
+_TEST_PATHS = (r"_test\.go$", r"(^|/)test_[^/]*\.py$", r"_test\.py$", r"(^|/)conftest\.py$")
+
+
+DEFAULT_PRETAG_RULES: Tuple[PreTagRule, ...] = (
+    _rule("test_file", ("STYLE", "TEST"), 0.95, paths=_TEST_PATHS),
+    _rule(
+        "config_file",
+        ("CONFIG",),
+        0.95,
+        paths=(
+            r"(^|/)go\.(mod|sum)$",
+            r"\.(ya?ml|toml|ini|cfg)$",
+            r"(^|/)\.env(\.[^/]*)?$",
+            r"(^|/)requirements[^/]*\.txt$",
+            r"(^|/)(pyproject\.toml|setup\.cfg|Dockerfile|Makefile)$",
+        ),
+    ),
+    _rule(
+        "go_exported_signature",
+        ("STYLE", "API"),
+        0.85,
+        paths=(r"\.go$",),
+        lines=(r"^func\s+(\([^)]*\)\s*)?[A-Z]\w*\s*[\[(]", r"^type\s+[A-Z]\w*\s"),
+        exclude_paths=_TEST_PATHS,
+    ),
+    _rule(
+        "py_public_signature",
+        ("STYLE", "API"),
+        0.85,
+        paths=(r"\.py$",),
+        lines=(r"^(async\s+)?def\s+[A-Za-z]\w*\s*\(", r"^class\s+[A-Za-z]\w*"),
+        exclude_paths=_TEST_PATHS,
+    ),
+    # 单层缩进的 def 可能是方法，也可能是模块级函数里的嵌套 helper，单独命中不足以判定
+    _rule(
+        "py_public_method",
+        ("STYLE", "API"),
+        0.6,
+        paths=(r"\.py$",),
+        lines=(r"^(    |\t)(async\s+)?def\s+[A-Za-z]\w*\s*\(",),
+        exclude_paths=_TEST_PATHS,
+    ),
+    _rule(
+        "env_access",
+        ("STYLE", "CONFIG"),
+        0.85,
+        paths=(r"\.(go|py)$",),
+        lines=(r"os\.(Getenv|LookupEnv|getenv|environ)",),
+    ),
+)
+
+
+@dataclass(frozen=True)
+class PreTagger:
+    """基于规则的本地打标：路径/改动行命中规则时直接给出标签，只有规则无法判定时才调用 LLM 打标。
+
+    命中规则的标签取并集，置信度取命中规则的最大值；达到 ``min_confidence`` 即视为已判定。
+    """
+
+    rules: Tuple[PreTagRule, ...] = DEFAULT_PRETAG_RULES
+    min_confidence: float = 0.8
+
+    def decide(self, file_diff: FileDiff) -> Optional[PreTagDecision]:
+        path = file_diff.b_path or file_diff.a_path or ""
+        changed = _changed_lines(file_diff)
+        matched = [rule for rule in self.rules if rule.matches(path, changed)]
+        if not matched:
+            return None
+        tags: List[Tag] = []
+        for rule in matched:
+            tags.extend(tag for tag in rule.tags if tag not in tags)
+        confidence = max(rule.confidence for rule in matched)
+        return PreTagDecision(
+            tags=tuple(tags),
+            confidence=confidence,
+            rules=tuple(rule.name for rule in matched),
+            conclusive=confidence >= self.min_confidence,
+        )
+
+
+@dataclass
+class PreTaggerStats:
+    decided: int = 0
+    fallback: int = 0
+    # 本地判定的文件中，打标缓存本来就能命中的数量（这些文件并未省下 LLM 调用）
+    cached: int = 0
+    by_rule: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def saved_calls(self) -> int:
+        return self.decided - self.cached
+
+    def record(self, decision: Optional[PreTagDecision], *, cached: bool = False) -> None:
+        if decision is None or not decision.conclusive:
+            self.fallback += 1
+            return
+        self.decided += 1
+        if cached:
+            self.cached += 1
+        for name in decision.rules:
+            self.by_rule[name] = self.by_rule.get(name, 0) + 1
+
+
+def _changed_lines(file_diff: FileDiff) -> List[str]:
+    lines: List[str] = []
+    for hunk in file_diff.hunks:
+        for line in hunk.text.splitlines()[1:]:
+            if line.startswith(("+", "-")) and not line.startswith(("+++", "---")):
+                lines.append(line[1:])
+    return lines
+
+
+__all__ = ["DEFAULT_PRETAG_RULES", "PreTagDecision", "PreTagRule", "PreTagger", "PreTaggerStats"]
@@ -8,6 +8,7 @@ from typing import Dict, Iterable, List, Optional, Tuple
 from cr_agent.rules import RULE_DOMAINS
 from cr_agent.rules.loader import _load_yaml  # reuse minimal YAML loader
 from cr_agent.models import Tag
+from cr_agent.pretagger import DEFAULT_PRETAG_RULES, PreTagger, PreTagRule
 
 
 @dataclass(frozen=True)
@@ -18,6 +19,9 @@ class RepoProfile:
     domains: Optional[Tuple[Tag, ...]] = None
     skip_regex: Tuple[re.Pattern, ...] = tuple()
     skip_basenames: Tuple[str, ...] = tuple()
+    priorities: Dict[str, int] = field(default_factory=dict)
+    # None 表示关闭本地预打标，所有文件都走 LLM 打标
+    pretagger: Optional[PreTagger] = field(default_factory=PreTagger)
 
 
 @dataclass(frozen=True)
@@ -67,6 +71,8 @@ def _parse_repo_profile(item: Dict, allow_empty_match: bool = False) -> RepoProf
     domains = _normalize_domains(item.get("domains"))
     skip_regex = _compile_patterns(item.get("skip_regex") or [])
     skip_basenames = tuple(str(b).strip() for b in item.get("skip_basenames") or [] if str(b).strip())
+    priorities = _normalize_priorities(item.get("priorities"))
+    pretagger = _parse_pretagger(item.get("pretagger"))
 
     return RepoProfile(
         name=name,
@@ -75,6 +81,8 @@ def _parse_repo_profile(item: Dict, allow_empty_match: bool = False) -> RepoProf
         domains=domains,
         skip_regex=skip_regex,
         skip_basenames=skip_basenames,
+        priorities=priorities,
+        pretagger=pretagger,
     )
 
 
@@ -102,3 +110,67 @@ def _normalize_domains(value) -> Optional[Tuple[Tag, ...]]:
         if tag not in out:
             out.append(tag)  # type: ignore[arg-type]
     return tuple(out) if out else None
+
+
+_PRIORITY_CALL_TYPES: Tuple[str, ...] = ("tagger", "refine")
+
+
+def _normalize_priorities(value) -> Dict[str, int]:
+    """Parse ``priorities`` (call type or domain -> int, smaller runs first)."""
+    if not value:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError("priorities 必须是映射，例如 {tagger: 0, SEC: 10, STYLE: 40, refine: 50}")
+    out: Dict[str, int] = {}
+    for key, raw in value.items():
+        text = str(key).strip()
+        name = text if text in _PRIORITY_CALL_TYPES else text.upper()
+        if name not in _PRIORITY_CALL_TYPES and name not in RULE_DOMAINS:
+            raise ValueError(f"priorities 的键 '{text}' 不受支持，必须属于 {_PRIORITY_CALL_TYPES + RULE_DOMAINS}")
+        try:
+            out[name] = int(raw)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"priorities.{text} 必须是整数，got {raw}") from exc
+    return out
+
+
+def _parse_pretagger(value) -> Optional[PreTagger]:
+    """Parse ``pretagger`` ({enabled, min_confidence, builtin_rules, rules}); absent means built-in rules."""
+    if value is None:
+        return PreTagger()
+    if not isinstance(value, dict):
+        raise ValueError("pretagger 必须是映射，例如 {enabled: true, min_confidence: 0.8, rules: [...]}")
+    if not value.get("enabled", True):
+        return None
+    try:
+        min_confidence = float(value.get("min_confidence", 0.8))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"pretagger.min_confidence 必须是数字，got {value.get('min_confidence')}") from exc
+
+    rules: List[PreTagRule] = list(DEFAULT_PRETAG_RULES) if value.get("builtin_rules", True) else []
+    for idx, raw in enumerate(value.get("rules") or []):
+        if not isinstance(raw, dict):
+            raise ValueError(f"pretagger.rules[{idx}] 必须是映射")
+        tags = _normalize_domains(raw.get("tags"))
+        if not tags:
+            raise ValueError(f"pretagger.rules[{idx}] 缺少 tags")
+        paths = _compile_patterns(raw.get("paths") or [])
+        lines = _compile_patterns(raw.get("lines") or [])
+        exclude_paths = _compile_patterns(raw.get("exclude_paths") or [])
+        if not paths and not lines:
+            raise ValueError(f"pretagger.rules[{idx}] 至少需要 paths 或 lines 之一")
+        try:
+            confidence = float(raw.get("confidence", 0.9))
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"pretagger.rules[{idx}].confidence 必须是数字") from exc
+        rules.append(
+            PreTagRule(
+                name=str(raw.get("name") or f"profile_rule_{idx + 1}"),
+                tags=tags,
+                confidence=confidence,
+                paths=paths,
+                lines=lines,
+                exclude_paths=exclude_paths,
+            )
+        )
+    return PreTagger(rules=tuple(rules), min_confidence=min_confidence)
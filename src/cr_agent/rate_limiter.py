@@ -1,8 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
+import itertools
+import json
 import time
-from typing import Any, Optional, Protocol
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterator, List, Optional, Protocol, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import RunnableBinding, RunnableSequence
+from pydantic import ConfigDict
+
+from cr_agent.budget import LLMUsageStats, RunBudget
+from cr_agent.circuit_breaker import CircuitBreaker
+from cr_agent.single_flight import SingleFlight, request_key
 
 
 class RateLimiterProtocol(Protocol):
@@ -18,54 +35,506 @@ class _AsyncLimiterBase:
         return False
 
 
+# 调用类型 -> 优先级，数值越小越先获得限速额度。打标位于每个文件的关键路径上，
+# 高风险领域（SEC/CONC）先于一般领域，上下文精炼只影响报告展示，排在最后。
+DEFAULT_LLM_PRIORITIES: dict[str, int] = {
+    "tagger": 0,
+    "SEC": 10,
+    "CONC": 10,
+    "ERROR": 20,
+    "API": 20,
+    "PERF": 20,
+    "CONFIG": 20,
+    "TEST": 30,
+    "STYLE": 40,
+    "refine": 50,
+}
+DEFAULT_PRIORITY = 30
+
+_LLM_PRIORITY: ContextVar[int] = ContextVar("cr_llm_priority", default=DEFAULT_PRIORITY)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed LLM calls (including ones in child tasks) with the given priority."""
+    token = _LLM_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _LLM_PRIORITY.reset(token)
+
+
+def current_llm_priority() -> int:
+    return _LLM_PRIORITY.get()
+
+
 class AsyncRateLimiter(_AsyncLimiterBase):
-    """简单限速器：确保任意两次调用间隔 >= 1 / qps 秒。"""
+    """令牌桶限速器：按 qps 补充令牌，最多积累 burst 个用于突发；可选 max_inflight 限制同时在途的请求数。
 
-    def __init__(self, qps: float):
-        self.interval = 1.0 / max(qps, 1e-6)
-        self._lock = asyncio.Lock()
-        self._next_time = 0.0
+    资源不足时调用方进入优先级队列（见 llm_priority），按 (优先级, 到达顺序) 依次获得
+    令牌与在途名额；等待期间不持有任何锁，取消的等待者直接出队。
+    burst=1 且不设 max_inflight 时等价于旧版“两次调用间隔 >= 1 / qps 秒”。
+    """
+
+    def __init__(self, qps: Optional[float], *, burst: int = 1, max_inflight: Optional[int] = None):
+        self.rate = float(qps) if qps and qps > 0 else None
+        self.burst = max(1, int(burst))
+        self.max_inflight = int(max_inflight) if max_inflight and max_inflight > 0 else None
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._inflight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self, now: float) -> None:
+        if self.rate is None:
+            return
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _token_wait(self, now: float) -> float:
+        """Seconds until a token is available (0 when one is)."""
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        if self._tokens >= 1.0:
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def _has_slot(self) -> bool:
+        return self.max_inflight is None or self._inflight < self.max_inflight
+
+    def _grant(self) -> None:
+        if self.rate is not None:
+            self._tokens -= 1.0
+        self._inflight += 1
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand tokens/slots to queued waiters in priority order; re-arm a timer when out of tokens."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            fut = self._waiters[0][2]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_slot():
+                return  # _release() 会再次调度
+            wait = self._token_wait(time.monotonic())
+            if wait > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._grant()
+            fut.set_result(None)
 
     async def __aenter__(self):
-        async with self._lock:
-            now = time.monotonic()
-            wait = max(0.0, self._next_time - now)
-            if wait:
-                await asyncio.sleep(wait)
-            self._next_time = time.monotonic() + self.interval
+        if not self._waiters and self._has_slot() and self._token_wait(time.monotonic()) <= 0:
+            self._grant()
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (current_llm_priority(), next(self._seq), fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()  # 已获批但调用方被取消
+            else:
+                fut.cancel()
+                self._dispatch()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+        return False
+
+
+class AdaptiveRateLimiter(AsyncRateLimiter):
+    """AIMD 自适应限速器：成功时加性提升速率，遇到 429/503 时乘性降低，并遵守 Retry-After。
+
+    速率在 [min_qps, max_qps] 之间浮动（max_qps 为 None 时不设上限）；
+    同一实例被打标链、标签 agent 与 ContextRefiner 共享，因此任一路径的限流信号都会让全局降速。
+    """
+
+    def __init__(
+        self,
+        qps: float,
+        *,
+        burst: int = 1,
+        max_inflight: Optional[int] = None,
+        min_qps: float = 0.2,
+        max_qps: Optional[float] = None,
+        increase_step: float = 0.5,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0,
+    ):
+        super().__init__(qps, burst=burst, max_inflight=max_inflight)
+        self.min_qps = max(min_qps, 1e-3)
+        self.max_qps = max_qps
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.rate = self._clamp(float(qps))
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+
+    def _clamp(self, rate: float) -> float:
+        rate = max(self.min_qps, rate)
+        if self.max_qps is not None:
+            rate = min(self.max_qps, rate)
+        return rate
+
+    def _token_wait(self, now: float) -> float:
+        return max(super()._token_wait(now), self._paused_until - now)
+
+    def on_success(self) -> None:
+        """Additive increase: roughly +increase_step qps per second of sustained success."""
+        self._refill(time.monotonic())
+        self.rate = self._clamp(self.rate + self.increase_step / max(self.rate, 1.0))
+        self._dispatch()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease (at most once per cooldown) and pause for Retry-After."""
+        now = time.monotonic()
+        self._refill(now)
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self.rate = self._clamp(self.rate * self.decrease_factor)
+            self._last_decrease = now
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        self._dispatch()
 
 
 class NoopRateLimiter(_AsyncLimiterBase):
     """No-op context manager used when no rate limit is configured."""
 
 
-class RateLimitedLLM:
-    """Wrap an LLM so every invoke/ainvoke acquires the limiter."""
+class LLMThrottledError(RuntimeError):
+    """Raised when the provider keeps throttling (429/503) after the wrapper's retries."""
+
+    def __init__(self, message: str, *, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
-    def __init__(self, llm: Any, limiter: RateLimiterProtocol):
-        self._llm = llm
-        self._limiter = limiter
+THROTTLE_STATUS_CODES: tuple[int, ...] = (429, 503)
 
-    async def ainvoke(self, *args, **kwargs):
-        async with self._limiter:
-            return await self._llm.ainvoke(*args, **kwargs)
 
-    def invoke(self, *args, **kwargs):
+def throttle_retry_after(exc: BaseException) -> Optional[float]:
+    """Return Retry-After seconds (0.0 when absent) if exc is a throttling response, else None."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status not in THROTTLE_STATUS_CODES:
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return 0.0
+
+
+class TokenRateLimiter:
+    """按每分钟 token 数（TPM）准入的令牌桶。
+
+    调用前按预估的 prompt token 数预约额度（可透支，透支部分按补充速率等待），
+    调用后用服务端返回的实际用量（含输出 token）修正差额。
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(max(1, int(tokens_per_minute)))
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> None:
+        cost = float(max(0, tokens))
+        self._refill(time.monotonic())
+        self._tokens -= cost
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            self._tokens += cost
+            raise
+
+    def reconcile(self, estimated: int, actual: Optional[int]) -> None:
+        """Settle a reservation once the real usage is known (None keeps the estimate)."""
+        if actual is None:
+            return
+        self._refill(time.monotonic())
+        self._tokens = min(self.capacity, self._tokens + float(estimated) - float(actual))
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：ASCII 约 4 字符/token，其余（中文等）约 1 字符/token。"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def estimate_prompt_tokens(messages: List[BaseMessage], kwargs: Optional[dict] = None) -> int:
+    """Estimate prompt tokens for a model call, including bound tools/response schema."""
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+        total += estimate_tokens(content) + 4
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            total += estimate_tokens(json.dumps(tool_calls, ensure_ascii=False, default=str))
+    for key in ("tools", "response_format"):
+        value = (kwargs or {}).get(key)
+        if value:
+            total += estimate_tokens(json.dumps(value, ensure_ascii=False, default=str))
+    return total
+
+
+def usage_total_tokens(result: ChatResult) -> Optional[int]:
+    """Total tokens reported by the provider for a generation, if any."""
+    for generation in result.generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage and usage.get("total_tokens") is not None:
+            return int(usage["total_tokens"])
+    token_usage = (result.llm_output or {}).get("token_usage") or {}
+    total = token_usage.get("total_tokens")
+    return int(total) if total is not None else None
+
+
+class RateLimitedLLM(BaseChatModel):
+    """Wrap a chat model so every generation acquires the limiter.
+
+    The wrapper is itself a chat model, so ``bind_tools``/``with_structured_output``
+    (used by the tagger chain, ReAct agents and ContextRefiner) stay behind the
+    limiter instead of falling through to the raw model.  The limiter is held only
+    for the duration of a single model call, never across a whole agent run.
+    An optional ``token_limiter`` additionally admits calls against a TPM budget,
+    and an optional per-run ``budget`` is reserved before and settled after each call.
+    An optional ``breaker`` (CircuitBreaker) fails calls fast with CircuitOpenError
+    while the endpoint is considered down, and an optional ``single_flight``
+    collapses concurrent identical requests into one underlying call.  An optional
+    ``usage`` (LLMUsageStats) records the provider-reported token usage of every
+    call actually sent, including prompt-cache hits.
+
+    Throttling responses (429/503) are reported to the limiter's ``on_throttle``
+    hook (see AdaptiveRateLimiter) and retried up to ``max_throttle_retries``
+    times; after that LLMThrottledError is raised so callers can skip fallbacks
+    that would only add more load.  With ``handle_throttling=False`` (the outer
+    budget/breaker wrapper, which has no limiter of its own) throttling errors
+    pass through unchanged and keep the callers' normal fallback handling.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseChatModel
+    limiter: Any
+    token_limiter: Optional[TokenRateLimiter] = None
+    max_throttle_retries: int = 0
+    budget: Optional[RunBudget] = None
+    breaker: Optional[CircuitBreaker] = None
+    single_flight: Optional[SingleFlight] = None
+    usage: Optional[LLMUsageStats] = None
+    handle_throttling: bool = True
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        limiter: Optional[RateLimiterProtocol] = None,
+        *,
+        token_limiter: Optional[TokenRateLimiter] = None,
+        max_throttle_retries: int = 0,
+        budget: Optional[RunBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        single_flight: Optional[SingleFlight] = None,
+        usage: Optional[LLMUsageStats] = None,
+        handle_throttling: bool = True,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            llm=llm,
+            limiter=limiter or NoopRateLimiter(),
+            token_limiter=token_limiter,
+            max_throttle_retries=max(0, max_throttle_retries),
+            budget=budget,
+            breaker=breaker,
+            single_flight=single_flight,
+            usage=usage,
+            handle_throttling=handle_throttling,
+            **kwargs,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return dict(self.llm._identifying_params)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.single_flight is None:
+            return await self._agenerate_guarded(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = request_key(self._identifying_params, messages, stop, kwargs)
+        return await self.single_flight.run(
+            key, lambda: self._agenerate_guarded(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+
+    async def _agenerate_guarded(self, messages, *, stop, run_manager, **kwargs) -> ChatResult:
+        if self.budget is not None and self.budget.enabled:
+            # 在途调用也占用预算：准入与预约在同一步完成，并发调用不会一起越过检查
+            reservation = self.budget.reserve(estimate_prompt_tokens(messages, kwargs))
+            try:
+                result = await self._agenerate_breaker(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except BaseException:
+                self.budget.release(reservation)
+                raise
+            self.budget.settle(reservation, result)
+            return result
+        result = await self._agenerate_breaker(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if self.budget is not None:
+            self.budget.record(result, estimated_input=estimate_prompt_tokens(messages, kwargs))
+        return result
+
+    async def _agenerate_breaker(self, messages, *, stop, run_manager, **kwargs) -> ChatResult:
+        if self.breaker is None:
+            return await self._agenerate_admitted(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.breaker.before_call()
+        try:
+            result = await self._agenerate_admitted(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception as exc:
+            self.breaker.record_failure(exc)
+            raise
+        except BaseException:
+            self.breaker.record_ignored()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _agenerate_admitted(self, messages, *, stop, run_manager, **kwargs) -> ChatResult:
+        estimated = 0
+        if self.token_limiter is not None:
+            estimated = estimate_prompt_tokens(messages, kwargs)
+            await self.token_limiter.acquire(estimated)
+        result = await self._agenerate_with_throttle_retry(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if self.token_limiter is not None:
+            self.token_limiter.reconcile(estimated, usage_total_tokens(result))
+        if self.usage is not None:
+            self.usage.record(result)
+        return result
+
+    async def _agenerate_with_throttle_retry(self, messages, *, stop, run_manager, **kwargs) -> ChatResult:
+        if not self.handle_throttling:
+            async with self.limiter:
+                return await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        attempt = 0
+        while True:
+            try:
+                async with self.limiter:
+                    result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as exc:
+                retry_after = throttle_retry_after(exc)
+                if retry_after is None:
+                    raise
+                on_throttle = getattr(self.limiter, "on_throttle", None)
+                if on_throttle is not None:
+                    on_throttle(retry_after)
+                if attempt >= self.max_throttle_retries:
+                    raise LLMThrottledError(f"LLM 请求被限流：{exc}", retry_after=retry_after) from exc
+                attempt += 1
+                if on_throttle is None:
+                    # 非自适应限速器不会暂停放行，这里自行退避
+                    await asyncio.sleep(max(retry_after, float(2 ** attempt)))
+                continue
+            on_success = getattr(self.limiter, "on_success", None)
+            if on_success is not None:
+                on_success()
+            return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
             loop = None
         if loop and loop.is_running():
             raise RuntimeError("RateLimitedLLM.invoke cannot run inside an existing event loop")
-        return asyncio.run(self.ainvoke(*args, **kwargs))
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return rebind_runnable(self.llm.bind_tools(tools, **kwargs), source=self.llm, target=self)
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        return rebind_runnable(self.llm.with_structured_output(schema, **kwargs), source=self.llm, target=self)
+
+
+def rebind_runnable(runnable: Any, *, source: Any, target: Any) -> Any:
+    """Point a runnable built on ``source`` (bind_tools / with_structured_output) at ``target``.
 
-    def __getattr__(self, item):
-        return getattr(self._llm, item)
+    Used by chat-model wrappers so bound tools/response formats produced by the
+    inner model are replayed through the wrapper's own ``_agenerate``.
+    """
+    if isinstance(runnable, RunnableBinding) and runnable.bound is source:
+        return RunnableBinding(bound=target, kwargs=runnable.kwargs, config=runnable.config)
+    if isinstance(runnable, RunnableSequence):
+        first, *rest = runnable.steps
+        rebound = rebind_runnable(first, source=source, target=target)
+        if rebound is not first:
+            return RunnableSequence(rebound, *rest)
+    return runnable
 
 
 __all__ = [
+    "DEFAULT_LLM_PRIORITIES",
+    "DEFAULT_PRIORITY",
+    "AdaptiveRateLimiter",
     "AsyncRateLimiter",
+    "LLMThrottledError",
     "NoopRateLimiter",
     "RateLimiterProtocol",
     "RateLimitedLLM",
+    "TokenRateLimiter",
+    "current_llm_priority",
+    "estimate_prompt_tokens",
+    "estimate_tokens",
+    "llm_priority",
+    "rebind_runnable",
+    "throttle_retry_after",
 ]
@@ -9,6 +9,7 @@ from typing import Dict, Iterable, List, Optional, Tuple
 
 from markdown_it import MarkdownIt
 
+from cr_agent.budget import format_budget_summary
 from cr_agent.models import CRIssue, CommitDiff, FileCRResult, FileDiff, FileHunk
 from cr_agent.rules import get_rules_catalog
 
@@ -18,8 +19,11 @@ def render_markdown_report(
     repo_path: str,
     commit_diff: CommitDiff,
     file_results: Iterable[FileCRResult],
+    budget_summary: Optional[Dict[str, object]] = None,
 ) -> str:
-    renderer = _MarkdownReportRenderer(repo_path=Path(repo_path), commit_diff=commit_diff)
+    renderer = _MarkdownReportRenderer(
+        repo_path=Path(repo_path), commit_diff=commit_diff, budget_summary=budget_summary
+    )
     return renderer.render(list(file_results))
 
 
@@ -169,6 +173,7 @@ def summarize_to_cli(*, commit_diff: CommitDiff, file_results: Iterable[FileCRRe
 class _MarkdownReportRenderer:
     repo_path: Path
     commit_diff: CommitDiff
+    budget_summary: Optional[Dict[str, object]] = None
     _file_index: Dict[str, FileDiff] = field(init=False, default_factory=dict)
 
     def __post_init__(self) -> None:
@@ -205,6 +210,8 @@ class _MarkdownReportRenderer:
             f"- 变更摘要：{commit_title or '（无提交信息）'}",
             f"- 文件数：{files_count}（通过 {approvals}，需人工 {needs_review}）",
         ]
+        if self.budget_summary:
+            lines.append(f"- LLM 预算：{format_budget_summary(self.budget_summary)}")
         breakdown = self._render_file_issue_breakdown(results)
         if breakdown:
             lines.append("")
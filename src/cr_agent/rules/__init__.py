@@ -4,11 +4,13 @@ import os
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from .doc_store import RuleDocStore, get_rule_doc_store
 from .loader import (
     RULE_DOMAINS,
     SUPPORTED_LANGUAGES,
     RulesCatalog,
     RuleIndex,
+    RuleDetector,
     RuleMeta,
     load_rules_catalog,
     load_rules_index,
@@ -37,11 +39,22 @@ def _resolve_rules_dir() -> Path:
     return path
 
 
+def _resolve_snapshot_path() -> Optional[Path]:
+    """CR_RULES_SNAPSHOT, else <CR_CACHE_DIR>/rules_catalog.json, else no snapshot."""
+    value = (os.getenv("CR_RULES_SNAPSHOT") or "").strip()
+    if value:
+        return Path(value).expanduser()
+    cache_dir = (os.getenv("CR_CACHE_DIR") or "").strip()
+    if cache_dir:
+        return Path(cache_dir).expanduser() / "rules_catalog.json"
+    return None
+
+
 def _load_default_catalog() -> RulesCatalog:
     try:
         rules_dir = _resolve_rules_dir()
         if rules_dir.exists():
-            return load_rules_catalog(rules_dir=rules_dir)
+            return load_rules_catalog(rules_dir=rules_dir, snapshot_path=_resolve_snapshot_path())
     except Exception:
         pass
     return _empty_catalog()
@@ -69,12 +82,15 @@ __all__ = [
     "RULE_DOMAINS",
     "SUPPORTED_LANGUAGES",
     "RuleIndex",
+    "RuleDetector",
+    "RuleDocStore",
     "RuleMeta",
     "RulesCatalog",
     "GLOBAL_RULES_CATALOG",
     "GLOBAL_RULES_BY_LANGUAGE",
     "GLOBAL_RULES_BY_DOMAIN",
     "GLOBAL_RULES_BY_LANGUAGE_DOMAIN",
+    "get_rule_doc_store",
     "get_rules_catalog",
     "load_rules_catalog",
     "load_rules_index",
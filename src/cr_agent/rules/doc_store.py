@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+TRUNCATED_MARKER = "\n...<内容截断>..."
+
+
+@dataclass
+class _DocEntry:
+    mtime_ns: int
+    size: int
+    text: str
+    checked_at: float
+
+
+class RuleDocStore:
+    """进程内的规则文档缓存：每个 Markdown 只读取、截断一次，之后直接返回内存中的文本。
+
+    文件的 mtime/size 变化时重新加载；为避免每次调用都 stat，同一文件在
+    ``check_interval`` 秒内不重复检查。读取时最多读入 ``max_chars`` 个字符所需的字节，
+    超大的规则文档不会被整份读入内存。协程中使用 ``aread``：需要 stat 或读盘时整体放到线程中执行。
+    """
+
+    def __init__(self, *, max_chars: int = 4000, check_interval: float = 2.0):
+        self.max_chars = max(1, int(max_chars))
+        self.check_interval = max(0.0, check_interval)
+        self._entries: Dict[str, _DocEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def read(self, path: str | os.PathLike[str]) -> str:
+        """Return the (truncated) document text; raises OSError like ``Path.read_text``."""
+        key = os.fspath(path)
+        text = self._fresh_text(key)
+        if text is not None:
+            return text
+        return self._stat_and_read(key)
+
+    async def aread(self, path: str | os.PathLike[str]) -> str:
+        """Async ``read``: recently checked entries return directly, freshness stat and loading run in a thread."""
+        key = os.fspath(path)
+        text = self._fresh_text(key)
+        if text is not None:
+            return text
+        return await asyncio.to_thread(self._stat_and_read, key)
+
+    def _fresh_text(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self.hits += 1
+                return entry.text
+        return None
+
+    def _stat_and_read(self, key: str) -> str:
+        now = time.monotonic()
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                entry.checked_at = now
+                self.hits += 1
+                return entry.text
+        text = self._load(key)
+        with self._lock:
+            self._entries[key] = _DocEntry(stat.st_mtime_ns, stat.st_size, text, now)
+            self.loads += 1
+        return text
+
+    def preload(self, paths: Iterable[Optional[str | os.PathLike[str]]]) -> None:
+        for path in paths:
+            if not path:
+                continue
+            try:
+                self.read(path)
+            except OSError:
+                continue  # 缺失的文档留给调用时按原逻辑报错
+
+    def _load(self, path: str) -> str:
+        # UTF-8 每个字符最多 4 字节，读入这么多字节足以判断是否需要截断
+        limit = self.max_chars * 4
+        with open(path, "rb") as fh:
+            data = fh.read(limit + 1)
+        text = data[:limit].decode("utf-8", errors="ignore") if len(data) > limit else data.decode("utf-8")
+        if len(data) > limit or len(text) > self.max_chars:
+            return text[: self.max_chars] + TRUNCATED_MARKER
+        return text
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "loads": self.loads, "documents": len(self._entries)}
+
+
+_DOC_STORE: Optional[RuleDocStore] = None
+
+
+def get_rule_doc_store() -> RuleDocStore:
+    """Process-wide RuleDocStore shared by code_standard_doc and the review engine."""
+    global _DOC_STORE
+    if _DOC_STORE is None:
+        _DOC_STORE = RuleDocStore()
+    return _DOC_STORE
+
+
+__all__ = ["RuleDocStore", "TRUNCATED_MARKER", "get_rule_doc_store"]
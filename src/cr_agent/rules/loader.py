@@ -3,6 +3,7 @@ from __future__ import annotations
 import fnmatch
 import json
 import os
+import re
 from collections import defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -16,6 +17,30 @@ RULE_DOMAINS: Tuple[str, ...] = ("STYLE", "ERROR", "API", "CONC", "PERF", "SEC",
 SUPPORTED_LANGUAGES: Tuple[str, ...] = ("go", "python")
 
 
+@dataclass(frozen=True)
+class RuleDetector:
+    """Declarative local check from the ``detector`` front-matter section.
+
+    ``pattern`` is matched against each added line (without the leading ``+``);
+    ``preceding``/``preceding_absent`` must / must not match one of the ``window``
+    new-side lines right above it. ``files``/``exclude_files`` are globs over the
+    file path or basename. With ``only`` the rule is checked locally and is no
+    longer sent to the LLM.
+    """
+
+    pattern: str
+    message: str
+    files: Tuple[str, ...] = tuple()
+    exclude_files: Tuple[str, ...] = tuple()
+    preceding: Optional[str] = None
+    preceding_absent: Optional[str] = None
+    window: int = 1
+    category: Optional[str] = None
+    suggestion: Optional[str] = None
+    confidence: float = 0.9
+    only: bool = False
+
+
 @dataclass(frozen=True)
 class RuleMeta:
     rule_id: str
@@ -27,6 +52,11 @@ class RuleMeta:
     deprecated: bool = False
     doc_path: Optional[Path] = None
     raw: Dict[str, Any] = field(default_factory=dict)
+    detector: Optional[RuleDetector] = None
+
+    @property
+    def detector_only(self) -> bool:
+        return self.detector is not None and self.detector.only
 
 
 RuleIndex = Dict[str, RuleMeta]
@@ -40,10 +70,26 @@ class RulesCatalog:
     by_language_domain: Dict[str, Dict[str, List[RuleMeta]]]
 
 
-def load_rules_catalog(*, rules_dir: Path, extensions: Optional[Iterable[str]] = None) -> RulesCatalog:
-    """Load rule metadata from Markdown files under rules_dir."""
+SNAPSHOT_VERSION = 1
+
+
+def load_rules_catalog(
+    *,
+    rules_dir: Path,
+    extensions: Optional[Iterable[str]] = None,
+    snapshot_path: Optional[Path] = None,
+) -> RulesCatalog:
+    """Load rule metadata from Markdown files under rules_dir.
+
+    With ``snapshot_path`` the parsed rules are kept in a compiled JSON snapshot
+    keyed by each file's (path, size, mtime); only new or changed files are
+    parsed again and the snapshot is rewritten when anything changed.
+    """
     rules_dir = Path(rules_dir).expanduser().resolve()
-    rules_index = _parse_markdown_rules(rules_dir, extensions=extensions)
+    if snapshot_path is None:
+        rules_index = _parse_markdown_rules(rules_dir, extensions=extensions)
+    else:
+        rules_index = _parse_markdown_rules_with_snapshot(rules_dir, Path(snapshot_path), extensions=extensions)
 
     by_language = _aggregate_by_language(rules_index)
     by_domain = _aggregate_by_domain(rules_index)
@@ -56,9 +102,14 @@ def load_rules_catalog(*, rules_dir: Path, extensions: Optional[Iterable[str]] =
     )
 
 
-def load_rules_index(*, rules_dir: Path, extensions: Optional[Iterable[str]] = None) -> RuleIndex:
+def load_rules_index(
+    *,
+    rules_dir: Path,
+    extensions: Optional[Iterable[str]] = None,
+    snapshot_path: Optional[Path] = None,
+) -> RuleIndex:
     """Return only the id->RuleMeta mapping."""
-    return load_rules_catalog(rules_dir=rules_dir, extensions=extensions).by_id
+    return load_rules_catalog(rules_dir=rules_dir, extensions=extensions, snapshot_path=snapshot_path).by_id
 
 
 def _aggregate_by_language(rules_index: RuleIndex) -> Dict[str, List[RuleMeta]]:
@@ -97,60 +148,190 @@ def _aggregate_by_language_domain(rules_index: RuleIndex) -> Dict[str, Dict[str,
     }
 
 
-def _parse_markdown_rules(rules_dir: Path, *, extensions: Optional[Iterable[str]] = None) -> Dict[str, RuleMeta]:
+def _list_rule_files(rules_dir: Path, extensions: Optional[Iterable[str]]) -> List[Path]:
     if not rules_dir.exists():
         raise RulesConfigError(f"rules_dir 不存在：{rules_dir}")
     if not rules_dir.is_dir():
         raise RulesConfigError(f"rules_dir 不是目录：{rules_dir}")
-
-    index: Dict[str, RuleMeta] = {}
-    exts = _resolve_rule_extensions(extensions)
     md_files: List[Path] = []
-    for ext in exts:
+    for ext in _resolve_rule_extensions(extensions):
         md_files.extend(rules_dir.rglob(f"*{ext}"))
-    md_files = sorted(set(md_files))
-    for md_path in md_files:
-        text = md_path.read_text(encoding="utf-8")
-        front_matter = _extract_front_matter(text)
-        if front_matter is None:
+    return sorted(set(md_files))
+
+
+def _parse_markdown_rules(rules_dir: Path, *, extensions: Optional[Iterable[str]] = None) -> Dict[str, RuleMeta]:
+    index: Dict[str, RuleMeta] = {}
+    for md_path in _list_rule_files(rules_dir, extensions):
+        _add_rule(index, _parse_rule_file(md_path))
+    return index
+
+
+def _add_rule(index: Dict[str, RuleMeta], meta: Optional[RuleMeta]) -> None:
+    if meta is None:
+        return
+    if meta.rule_id in index:
+        raise RulesConfigError(f"规则 id 重复: {meta.rule_id}")
+    index[meta.rule_id] = meta
+
+
+def _parse_rule_file(md_path: Path) -> Optional[RuleMeta]:
+    text = md_path.read_text(encoding="utf-8")
+    front_matter = _extract_front_matter(text)
+    if front_matter is None:
+        return None
+    if not isinstance(front_matter, dict):
+        raise RulesConfigError(f"{md_path}: front-matter 必须是 YAML mapping")
+
+    rule_id = front_matter.get("id") or front_matter.get("rule_id")
+    if not rule_id:
+        raise RulesConfigError(f"{md_path}: 缺少规则 id")
+    rule_id = str(rule_id)
+
+    language = str(front_matter.get("language") or _infer_language(rule_id) or "")
+    if language and language not in SUPPORTED_LANGUAGES:
+        raise RulesConfigError(f"{rule_id}: 不支持的 language='{language}'，允许 {SUPPORTED_LANGUAGES}")
+    title = str(front_matter.get("title") or "")
+    severity = str(front_matter.get("severity")) if front_matter.get("severity") is not None else None
+    domains = _normalize_domains(front_matter.get("domains"), fallback=front_matter.get("domain"))
+    prompt_hint = (
+        str(front_matter.get("prompt_hint")) if front_matter.get("prompt_hint") is not None else None
+    )
+    deprecated = bool(front_matter.get("deprecated", False))
+    detector = _parse_detector(rule_id, front_matter.get("detector"), title=title)
+
+    return RuleMeta(
+        rule_id=rule_id,
+        title=title,
+        language=language,
+        severity=severity,
+        domains=domains,
+        prompt_hint=prompt_hint,
+        deprecated=deprecated,
+        doc_path=md_path,
+        raw=dict(front_matter),
+        detector=detector,
+    )
+
+
+def _parse_detector(rule_id: str, value: Any, *, title: str = "") -> Optional[RuleDetector]:
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise RulesConfigError(f"{rule_id}: detector 必须是 mapping")
+    pattern = value.get("pattern")
+    if not pattern:
+        raise RulesConfigError(f"{rule_id}: detector 缺少 pattern")
+    for key in ("pattern", "preceding", "preceding_absent"):
+        if value.get(key) is None:
             continue
-        if not isinstance(front_matter, dict):
-            raise RulesConfigError(f"{md_path}: front-matter 必须是 YAML mapping")
-
-        rule_id = front_matter.get("id") or front_matter.get("rule_id")
-        if not rule_id:
-            raise RulesConfigError(f"{md_path}: 缺少规则 id")
-        rule_id = str(rule_id)
-
-        language = str(front_matter.get("language") or _infer_language(rule_id) or "")
-        if language and language not in SUPPORTED_LANGUAGES:
-            raise RulesConfigError(f"{rule_id}: 不支持的 language='{language}'，允许 {SUPPORTED_LANGUAGES}")
-        title = str(front_matter.get("title") or "")
-        severity = str(front_matter.get("severity")) if front_matter.get("severity") is not None else None
-        domains = _normalize_domains(front_matter.get("domains"), fallback=front_matter.get("domain"))
-        prompt_hint = (
-            str(front_matter.get("prompt_hint")) if front_matter.get("prompt_hint") is not None else None
-        )
-        deprecated = bool(front_matter.get("deprecated", False))
-
-        if rule_id in index:
-            raise RulesConfigError(f"规则 id 重复: {rule_id}")
-
-        index[rule_id] = RuleMeta(
-            rule_id=rule_id,
-            title=title,
-            language=language,
-            severity=severity,
-            domains=domains,
-            prompt_hint=prompt_hint,
-            deprecated=deprecated,
-            doc_path=md_path,
-            raw=dict(front_matter),
-        )
+        try:
+            re.compile(str(value[key]))
+        except re.error as exc:
+            raise RulesConfigError(f"{rule_id}: detector.{key} 不是合法正则：{exc}") from exc
+    try:
+        window = int(value.get("window", 1))
+        confidence = float(value.get("confidence", 0.9))
+    except (TypeError, ValueError) as exc:
+        raise RulesConfigError(f"{rule_id}: detector.window/confidence 必须是数字") from exc
+    return RuleDetector(
+        pattern=str(pattern),
+        message=str(value.get("message") or title or rule_id),
+        files=_as_str_tuple(value.get("files")),
+        exclude_files=_as_str_tuple(value.get("exclude_files")),
+        preceding=str(value["preceding"]) if value.get("preceding") is not None else None,
+        preceding_absent=str(value["preceding_absent"]) if value.get("preceding_absent") is not None else None,
+        window=max(1, window),
+        category=str(value["category"]) if value.get("category") else None,
+        suggestion=str(value["suggestion"]) if value.get("suggestion") else None,
+        confidence=min(1.0, max(0.0, confidence)),
+        only=bool(value.get("only", False)),
+    )
+
 
+def _as_str_tuple(value: Any) -> Tuple[str, ...]:
+    if value is None:
+        return tuple()
+    if isinstance(value, (list, tuple, set)):
+        return tuple(str(item) for item in value if item is not None and str(item).strip())
+    return (str(value),)
+
+
+def _parse_markdown_rules_with_snapshot(
+    rules_dir: Path,
+    snapshot_path: Path,
+    *,
+    extensions: Optional[Iterable[str]] = None,
+) -> Dict[str, RuleMeta]:
+    exts = list(_resolve_rule_extensions(extensions))
+    header = {"version": SNAPSHOT_VERSION, "rules_dir": str(rules_dir), "extensions": exts}
+    cached_files: Dict[str, Any] = {}
+    try:
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+        if isinstance(snapshot, dict) and all(snapshot.get(k) == v for k, v in header.items()):
+            cached_files = snapshot.get("files") or {}
+    except (OSError, ValueError):
+        pass
+
+    index: Dict[str, RuleMeta] = {}
+    files: Dict[str, Any] = {}
+    changed = False
+    for md_path in _list_rule_files(rules_dir, exts):
+        stat = md_path.stat()
+        key = str(md_path)
+        entry = cached_files.get(key)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            meta = _rule_from_snapshot(entry.get("rule"), md_path)
+        else:
+            meta = _parse_rule_file(md_path)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rule": _rule_to_snapshot(meta)}
+            changed = True
+        files[key] = entry
+        _add_rule(index, meta)
+
+    if changed or set(files) != set(cached_files):
+        try:
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({**header, "files": files}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, snapshot_path)
+        except OSError:
+            pass  # 快照只是加速手段，写失败不影响加载结果
     return index
 
 
+def _rule_to_snapshot(meta: Optional[RuleMeta]) -> Optional[Dict[str, Any]]:
+    if meta is None:
+        return None
+    return {
+        "rule_id": meta.rule_id,
+        "title": meta.title,
+        "language": meta.language,
+        "severity": meta.severity,
+        "domains": list(meta.domains),
+        "prompt_hint": meta.prompt_hint,
+        "deprecated": meta.deprecated,
+        "raw": meta.raw,
+    }
+
+
+def _rule_from_snapshot(data: Optional[Dict[str, Any]], md_path: Path) -> Optional[RuleMeta]:
+    if data is None:
+        return None
+    return RuleMeta(
+        rule_id=data["rule_id"],
+        title=data.get("title", ""),
+        language=data.get("language", ""),
+        severity=data.get("severity"),
+        domains=tuple(data.get("domains") or ()),
+        prompt_hint=data.get("prompt_hint"),
+        deprecated=bool(data.get("deprecated", False)),
+        doc_path=md_path,
+        raw=dict(data.get("raw") or {}),
+        # detector 由 raw 中的 front-matter 重新得出，快照格式无需变化
+        detector=_parse_detector(data["rule_id"], (data.get("raw") or {}).get("detector"), title=data.get("title", "")),
+    )
+
+
 def _resolve_rule_extensions(extensions: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
     if extensions is None:
         env_value = os.getenv("CR_RULE_EXTENSIONS")
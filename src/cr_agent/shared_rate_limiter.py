@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import heapq
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from cr_agent.rate_limiter import AsyncRateLimiter, current_llm_priority
+
+
+class SharedRateLimiter(AsyncRateLimiter):
+    """同一主机上多个 agent.py 进程共享的令牌桶（状态文件 + fcntl 文件锁）。
+
+    令牌数与各进程的在途请求数保存在 ``state_path`` 指向的 JSON 文件中；判断与扣减在同一次
+    加锁内完成，因此 qps / burst / max_inflight 是所有共用该文件的进程的总额度，不会被并发进程同时占用。
+    进程内按优先级排队，只有队首争抢共享额度；其它进程释放额度时本进程收不到通知，按
+    ``poll_interval`` 轮询。文件锁与读写在线程中执行，不阻塞事件循环。已退出进程遗留的在途计数会被清理。
+    """
+
+    def __init__(
+        self,
+        qps: Optional[float],
+        *,
+        state_path: str | os.PathLike[str],
+        burst: int = 1,
+        max_inflight: Optional[int] = None,
+        poll_interval: float = 0.05,
+    ):
+        super().__init__(qps, burst=burst, max_inflight=max_inflight)
+        self.state_path = Path(state_path).expanduser()
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = max(0.001, poll_interval)
+        self._pid = os.getpid()
+        self._queue: List[list] = []
+        # 被取消的获取在后台归还名额；保留引用，避免任务未完成就被回收
+        self._releases: Set[asyncio.Task] = set()
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[dict]:
+        with open(self.state_path, "a+", encoding="utf-8") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                raw = fh.read()
+                try:
+                    state = json.loads(raw) if raw.strip() else {}
+                except json.JSONDecodeError:
+                    state = {}
+                before = dict(state)
+                yield state
+                if state != before:
+                    fh.seek(0)
+                    fh.truncate()
+                    fh.write(json.dumps(state))
+                    fh.flush()
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _refill_state(self, state: dict, now: float) -> None:
+        if self.rate is None:
+            return
+        tokens = float(state.get("tokens", self.burst))
+        updated = float(state.get("updated", now))
+        state["tokens"] = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate)
+        state["updated"] = now
+
+    @staticmethod
+    def _live_inflight(state: dict) -> Dict[str, int]:
+        inflight: Dict[str, int] = {}
+        for pid, count in (state.get("inflight") or {}).items():
+            if count > 0 and _pid_alive(int(pid)):
+                inflight[pid] = int(count)
+        state["inflight"] = inflight
+        return inflight
+
+    # 进程间共享的时间基准必须是墙钟时间
+    def _try_acquire(self) -> float:
+        """Check and grant a slot + token in one locked section; return 0 when granted, else seconds to wait."""
+        with self._locked_state() as state:
+            inflight = self._live_inflight(state)
+            if self.max_inflight is not None and sum(inflight.values()) >= self.max_inflight:
+                return self.poll_interval  # 其它进程释放名额时收不到通知，只能轮询
+            if self.rate is not None:
+                self._refill_state(state, time.time())
+                if state["tokens"] < 1.0:
+                    return (1.0 - state["tokens"]) / self.rate
+                state["tokens"] -= 1.0
+            inflight[str(self._pid)] = inflight.get(str(self._pid), 0) + 1
+        return 0.0
+
+    def _release_shared(self) -> None:
+        with self._locked_state() as state:
+            inflight = self._live_inflight(state)
+            remaining = inflight.get(str(self._pid), 0) - 1
+            if remaining > 0:
+                inflight[str(self._pid)] = remaining
+            else:
+                inflight.pop(str(self._pid), None)
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0][2].set()
+
+    async def __aenter__(self):
+        # 进程内按 (优先级, 到达顺序) 排队，只有队首去争抢共享额度；文件锁与读写放到线程里，不阻塞事件循环
+        entry = [current_llm_priority(), next(self._seq), asyncio.Event()]
+        heapq.heappush(self._queue, entry)
+        try:
+            while True:
+                if self._queue[0] is not entry:
+                    entry[2].clear()
+                    await entry[2].wait()
+                    continue
+                attempt = asyncio.ensure_future(asyncio.to_thread(self._try_acquire))
+                try:
+                    wait = await asyncio.shield(attempt)
+                except asyncio.CancelledError:
+                    task = asyncio.ensure_future(self._release_if_granted(attempt))
+                    self._releases.add(task)
+                    task.add_done_callback(self._releases.discard)
+                    raise
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, self.poll_interval))
+        finally:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._wake_head()
+        self._inflight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._inflight -= 1
+        await asyncio.to_thread(self._release_shared)
+        return False
+
+    async def _release_if_granted(self, attempt: asyncio.Future) -> None:
+        # 调用方在获批的同时被取消：归还已写入共享状态的名额（文件锁与读写同样放到线程里）
+        try:
+            wait = await attempt
+        except Exception:
+            return
+        if wait <= 0:
+            await asyncio.to_thread(self._release_shared)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+__all__ = ["SharedRateLimiter"]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from langchain_core.messages import BaseMessage
+
+T = TypeVar("T")
+
+_BYPASS: ContextVar[bool] = ContextVar("cr_single_flight_bypass", default=False)
+
+
+@contextmanager
+def bypass_single_flight() -> Iterator[None]:
+    """LLM calls started inside (including child tasks created here) never join an in-flight twin.
+
+    Hedged requests use this: they are identical on purpose and must not collapse into the call they hedge.
+    """
+    token = _BYPASS.set(True)
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+def request_key(
+    model_params: Dict[str, Any],
+    messages: List[BaseMessage],
+    stop: Optional[List[str]] = None,
+    kwargs: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hash of (model, messages incl. system prompt, stop, bound tools / response schema).
+
+    The key is exact: review and tagging prompts embed the file path, so identical diffs in
+    different files produce different keys and are not merged.
+    """
+    payload = {
+        "model": model_params,
+        "messages": [message.model_dump(exclude={"id"}) for message in messages],
+        "stop": stop,
+        "kwargs": kwargs or {},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """合并并发的相同请求：同一 key 在途时，后来者等待并获得第一个调用的结果（或异常）的独立副本。
+
+    在途调用在独立任务中执行，单个等待者被取消不影响其它等待者；所有等待者都离开后才取消该调用。
+    调用结束即出表，不缓存结果——之后的相同请求会重新调用。
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        if _BYPASS.get():
+            return await factory()
+        flight = self._flights.get(key)
+        leader = flight is None
+        if flight is None:
+            flight = _Flight(task=asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, k=key, f=flight: self._forget(k, f))
+        else:
+            self.shared += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        except Exception as exc:
+            flight.waiters -= 1
+            if leader:
+                raise
+            raise _copy_exception(exc) from exc
+        flight.waiters -= 1
+        # 跟随者拿到独立副本，避免下游修改消息对象时互相影响
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # 标记异常已读取，避免 "exception was never retrieved"
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "shared": self.shared}
+
+
+def _copy_exception(exc: Exception) -> Exception:
+    """跟随者抛出异常副本：同一异常对象被多个任务抛出时 __traceback__ / __context__ 会互相覆盖。"""
+    try:
+        return copy.deepcopy(exc)
+    except Exception:
+        # 持有锁、响应流等不可复制属性的异常退回浅复制，再不行就共享原对象
+        try:
+            return copy.copy(exc)
+        except Exception:
+            return exc
+
+
+__all__ = ["SingleFlight", "bypass_single_flight", "request_key"]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+SRC_ROOT = ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from cr_agent.rules.loader import RULE_DOMAINS, load_rules_catalog
+
+RULE_TEMPLATE = """---
+id: {rule_id}
+title: Synthetic rule {index}
+language: {language}
+severity: {severity}
+domains: [{domain}]
+prompt_hint: 检查第 {index} 条合成规则
+---
+
+# {rule_id}
+
+这是一条用于基准测试的合成规则。
+
+## 正例
+
+```
+ok()
+```
+"""
+
+
+def _write_rules(rules_dir: Path, count: int) -> None:
+    for index in range(count):
+        language = "go" if index % 2 == 0 else "python"
+        domain = RULE_DOMAINS[index % len(RULE_DOMAINS)]
+        rule_id = f"{'GO' if language == 'go' else 'PY'}-{domain}-{index:05d}"
+        path = rules_dir / language / f"{rule_id}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            RULE_TEMPLATE.format(
+                rule_id=rule_id,
+                index=index,
+                language=language,
+                severity="warning" if index % 3 else "error",
+                domain=domain,
+            ),
+            encoding="utf-8",
+        )
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def _bench(count: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="cr-rules-bench-") as tmp:
+        rules_dir = Path(tmp) / "rules"
+        snapshot = Path(tmp) / "rules_catalog.json"
+        _write_rules(rules_dir, count)
+        result = {
+            "parse": _timed(lambda: load_rules_catalog(rules_dir=rules_dir)),
+            "snapshot_cold": _timed(lambda: load_rules_catalog(rules_dir=rules_dir, snapshot_path=snapshot)),
+            "snapshot_warm": _timed(lambda: load_rules_catalog(rules_dir=rules_dir, snapshot_path=snapshot)),
+        }
+        # 改动一个文件：只有它会被重新解析
+        changed = next(rules_dir.rglob("*.md"))
+        changed.write_text(changed.read_text(encoding="utf-8") + "\n补充说明。\n", encoding="utf-8")
+        result["snapshot_one_changed"] = _timed(
+            lambda: load_rules_catalog(rules_dir=rules_dir, snapshot_path=snapshot)
+        )
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rules catalog load time with/without snapshot")
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma separated synthetic rule counts")
+    args = parser.parse_args()
+
+    sizes = [int(item) for item in args.sizes.split(",") if item.strip()]
+    columns = ("parse", "snapshot_cold", "snapshot_warm", "snapshot_one_changed")
+    print(f"{'rules':>8} " + " ".join(f"{col + '(ms)':>24}" for col in columns))
+    for count in sizes:
+        result = _bench(count)
+        print(f"{count:>8} " + " ".join(f"{result[col]:>24.1f}" for col in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,13 @@ Git工具函数模块
 
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+from collections import OrderedDict
 
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from git import Repo
 from langchain.tools import tool
@@ -21,31 +24,131 @@ from cr_agent.models import AgentState, CommitDiff, FileContentRef, FileDiff, Fi
 MAX_FILE_BYTES = 1_000_000
 
 
-@tool
-def load_file_content(ref: FileContentRef) -> bytes:
-    """
-    按需读取文件内容（bytes）。不依赖工作区，直接从 Git 对象库读取。
-    默认限制：1MB
-    """
-    repo = Repo(ref.repo_path)
-    commit = repo.commit(ref.commit_sha)
+class _RepoHandle:
+    """进程内复用的 Repo 句柄；GitPython 的 cat-file 进程不是线程安全的，读对象时需持有 lock。"""
+
+    def __init__(self, path: str):
+        self.repo = Repo(path)
+        self.lock = threading.Lock()
+
+
+class BlobCache:
+    """按 blob SHA 缓存文件内容的 LRU，按总字节数淘汰（blob 内容不可变，无需失效）。"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, blob_sha: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(blob_sha)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(blob_sha)
+            self.hits += 1
+            return data
+
+    def put(self, blob_sha: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(blob_sha, None)
+            if old is not None:
+                self._total -= len(old)
+            self._entries[blob_sha] = data
+            self._total += len(data)
+            while self._total > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= len(evicted)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._total}
+
+
+_REPO_HANDLES: Dict[str, _RepoHandle] = {}
+_REPO_HANDLES_LOCK = threading.Lock()
+_BLOB_CACHE: Optional[BlobCache] = None
+
+
+def _repo_handle(repo_path: str) -> _RepoHandle:
+    key = str(Path(repo_path).resolve())
+    with _REPO_HANDLES_LOCK:
+        handle = _REPO_HANDLES.get(key)
+        if handle is None:
+            handle = _REPO_HANDLES[key] = _RepoHandle(key)
+        return handle
+
+
+def get_blob_cache() -> BlobCache:
+    """Process-wide blob LRU; capacity from CR_BLOB_CACHE_MAX_MB (default 64, 0 disables)."""
+    global _BLOB_CACHE
+    if _BLOB_CACHE is None:
+        raw = os.getenv("CR_BLOB_CACHE_MAX_MB", "64").strip() or "64"
+        try:
+            max_mb = float(raw)
+        except ValueError:
+            raise ValueError(f"CR_BLOB_CACHE_MAX_MB must be a number, got {raw}")
+        _BLOB_CACHE = BlobCache(int(max_mb * 1024 * 1024))
+    return _BLOB_CACHE
+
+
+def _check_size(size: Optional[int], ref: FileContentRef) -> None:
+    if size is not None and size > MAX_FILE_BYTES:
+        raise ValueError(f"File too large (> {MAX_FILE_BYTES} bytes): {ref.path} @ {ref.commit_sha}")
 
-    blob = commit.tree / ref.path  # KeyError if not found
 
-    # 大小保护（尽量在读取前就拒绝）
-    if blob.size is not None and blob.size > MAX_FILE_BYTES:
-        raise ValueError(f"File too large (> {MAX_FILE_BYTES} bytes): {ref.path} @ {ref.commit_sha}")
+def read_file_content(ref: FileContentRef) -> bytes:
+    """读取 ref 对应的文件内容（bytes）：已知 blob_sha 时直接按 SHA 取对象并走 LRU，否则按 commit + 路径解析。"""
+    cache = get_blob_cache()
+    _check_size(ref.size, ref)
+    if ref.blob_sha:
+        cached = cache.get(ref.blob_sha)
+        if cached is not None:
+            return cached
+
+    handle = _repo_handle(ref.repo_path)
+    with handle.lock:
+        if ref.blob_sha:
+            binsha = bytes.fromhex(ref.blob_sha)
+            _check_size(handle.repo.odb.info(binsha).size, ref)
+            data = handle.repo.odb.stream(binsha).read(MAX_FILE_BYTES + 1)
+            blob_sha = ref.blob_sha
+        else:
+            blob = handle.repo.commit(ref.commit_sha).tree / ref.path  # KeyError if not found
+            # 大小保护（尽量在读取前就拒绝）
+            _check_size(blob.size, ref)
+            data = blob.data_stream.read(MAX_FILE_BYTES + 1)
+            blob_sha = blob.hexsha
 
-    data = blob.data_stream.read(MAX_FILE_BYTES + 1)
     if len(data) > MAX_FILE_BYTES:
         raise ValueError(f"File exceeds {MAX_FILE_BYTES} bytes while reading: {ref.path} @ {ref.commit_sha}")
+    cache.put(blob_sha, data)
     return data
 
 
+async def aread_file_content(ref: FileContentRef) -> bytes:
+    """read_file_content 的异步版本：Git 读取在线程池中执行，不阻塞事件循环。"""
+    return await asyncio.to_thread(read_file_content, ref)
+
+
+@tool
+def load_file_content(ref: FileContentRef) -> bytes:
+    """
+    按需读取文件内容（bytes）。不依赖工作区，直接从 Git 对象库读取。
+    默认限制：1MB
+    """
+    return read_file_content(ref)
+
+
 @tool
 def load_file_text(ref: FileContentRef, encoding: str = "utf-8", errors: str = "replace") -> str:
     """按需读取文件内容（text）。默认 utf-8，错误替换。"""
-    return load_file_content(ref).decode(encoding, errors)
+    return read_file_content(ref).decode(encoding, errors)
 
 
 def _count_added_deleted_from_patch(patch: str) -> Tuple[int, int]:
@@ -140,6 +243,13 @@ def _make_ref(repo_path: str, commit_sha: str, path: Optional[str],
         mode=mode,
     )
 
+def resolve_commit_sha(repo_path: str, rev: str) -> str:
+    """把分支名 / 短 SHA 等 revision 解析为完整的 commit SHA。"""
+    handle = _repo_handle(repo_path)
+    with handle.lock:
+        return handle.repo.commit(rev).hexsha
+
+
 def get_last_commit_diff(state: AgentState):
     """
     获取最新一次提交相对父提交的结构化diff（适合AI代码理解），并补齐 before_ref/after_ref。
@@ -1,34 +1,57 @@
 from __future__ import annotations
 
-from pathlib import Path
+from typing import Optional, Tuple
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
-from cr_agent.rules import get_rules_catalog
+from cr_agent.rules import get_rule_doc_store, get_rules_catalog
 
 
-@tool
-def code_standard_doc(rule_id: str) -> str:
-    """读取代码规范的 Markdown 文档，便于按规则审查。"""
+def _resolve_doc_path(rule_id: str) -> Tuple[Optional[str], str]:
+    """Return (doc path, "") or (None, message explaining why the rule has no document)."""
     try:
         catalog = get_rules_catalog()
     except Exception as exc:
-        return f"无法加载规则索引：{exc}"
+        return None, f"无法加载规则索引：{exc}"
 
     meta = catalog.by_id.get(rule_id) if catalog else None
     if not meta:
-        return f"未找到规则 {rule_id}，请确认 rule_id 是否正确。"
+        return None, f"未找到规则 {rule_id}，请确认 rule_id 是否正确。"
     if not meta.doc_path:
-        return f"规则 {rule_id} 未提供文档路径。"
+        return None, f"规则 {rule_id} 未提供文档路径。"
+    return str(meta.doc_path), ""
 
+
+def _read_error(rule_id: str, doc_path: str, exc: Exception) -> str:
+    if isinstance(exc, FileNotFoundError):
+        return f"规则 {rule_id} 的文档不存在：{doc_path}"
+    return f"读取规则 {rule_id} 文档失败：{exc}"
+
+
+def _code_standard_doc(rule_id: str) -> str:
+    doc_path, message = _resolve_doc_path(rule_id)
+    if doc_path is None:
+        return message
+    try:
+        return get_rule_doc_store().read(doc_path)
+    except Exception as exc:
+        return _read_error(rule_id, doc_path, exc)
+
+
+async def _acode_standard_doc(rule_id: str) -> str:
+    doc_path, message = _resolve_doc_path(rule_id)
+    if doc_path is None:
+        return message
     try:
-        content = Path(meta.doc_path).read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return f"规则 {rule_id} 的文档不存在：{meta.doc_path}"
+        # 需要检查 mtime 或读盘时，stat 与读取一起放到线程中执行，不阻塞事件循环
+        return await get_rule_doc_store().aread(doc_path)
     except Exception as exc:
-        return f"读取规则 {rule_id} 文档失败：{exc}"
+        return _read_error(rule_id, doc_path, exc)
+
 
-    max_chars = 4000
-    if len(content) > max_chars:
-        return content[:max_chars] + "\n...<内容截断>..."
-    return content
+code_standard_doc = StructuredTool.from_function(
+    func=_code_standard_doc,
+    coroutine=_acode_standard_doc,
+    name="code_standard_doc",
+    description="读取代码规范的 Markdown 文档，便于按规则审查。",
+)